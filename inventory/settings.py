@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import parse_qsl, urlparse
 
 from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
@@ -71,10 +71,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "products.profiling.ProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "products.routing.PrimaryStickinessMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -97,43 +99,185 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Keep compiled templates in memory. Django already does this when no
+    # loaders are given; being explicit keeps it if the list is ever changed.
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        ),
+    ]
+
 WSGI_APPLICATION = "inventory.wsgi.application"
 
+# Serve the product list and table partial with their native async views.
+# Only worth enabling under an ASGI server (inventory.asgi); under WSGI each
+# async view runs in its own event loop.
+INVENTORY_ASYNC_VIEWS = env_bool("INVENTORY_ASYNC_VIEWS", "False")
+
+
+SQLITE_PRAGMA_DEFAULTS = {
+    # WAL lets readers run while a write is in progress; NORMAL only syncs at
+    # checkpoints, which is still safe against corruption in WAL mode.
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": "134217728",
+}
+POSTGRES_PASSTHROUGH_OPTIONS = {"sslmode", "connect_timeout", "application_name"}
+
+
+def _url_bool(key: str, value: str) -> bool:
+    if value.lower() in TRUTHY_VALUES:
+        return True
+    if value.lower() in {"0", "false", "no", "off"}:
+        return False
+    raise ImproperlyConfigured(f"DATABASE_URL option '{key}' must be a boolean, got '{value}'.")
+
+
+def _url_int(key: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f"DATABASE_URL option '{key}' must be an integer, got '{value}'.")
+
+
+def _reject_unknown(options: dict, scheme: str) -> None:
+    if options:
+        raise ImproperlyConfigured(
+            f"Unsupported {scheme} DATABASE_URL option(s): {', '.join(sorted(options))}."
+        )
+
 
 def parse_database_url(url: str) -> dict:
+    """Build a DATABASES entry from a URL.
+
+    Query-string options tune the connection:
+
+    * postgres: ``pool_min``/``pool_max``/``pool_timeout`` enable psycopg's
+      connection pool; ``conn_max_age`` (seconds, or ``none`` for unlimited)
+      and ``health_checks`` keep plain persistent connections instead;
+      ``sslmode``, ``connect_timeout`` and ``application_name`` go to libpq.
+    * sqlite: ``journal_mode``, ``synchronous`` and ``mmap_size`` pragmas
+      (WAL, NORMAL and 128 MB unless overridden), ``busy_timeout`` in
+      milliseconds (default 5000), and ``transaction_mode``.
+    """
     parsed = urlparse(url)
     scheme = parsed.scheme
+    options = dict(parse_qsl(parsed.query))
     if scheme in {"postgres", "postgresql"}:
-        return {
+        config = {
             "ENGINE": "django.db.backends.postgresql",
             "NAME": (parsed.path or "").lstrip("/") or None,
             "USER": parsed.username,
             "PASSWORD": parsed.password,
             "HOST": parsed.hostname,
             "PORT": parsed.port,
+            "OPTIONS": {key: options.pop(key) for key in POSTGRES_PASSTHROUGH_OPTIONS & options.keys()},
         }
+        pool = {}
+        if "pool_min" in options:
+            pool["min_size"] = _url_int("pool_min", options.pop("pool_min"))
+        if "pool_max" in options:
+            pool["max_size"] = _url_int("pool_max", options.pop("pool_max"))
+        if "pool_timeout" in options:
+            pool["timeout"] = _url_int("pool_timeout", options.pop("pool_timeout"))
+        if "conn_max_age" in options:
+            value = options.pop("conn_max_age")
+            config["CONN_MAX_AGE"] = None if value.lower() == "none" else _url_int("conn_max_age", value)
+        if "health_checks" in options:
+            config["CONN_HEALTH_CHECKS"] = _url_bool("health_checks", options.pop("health_checks"))
+        _reject_unknown(options, scheme)
+        if pool:
+            if config.get("CONN_MAX_AGE"):
+                raise ImproperlyConfigured("DATABASE_URL cannot combine a connection pool with conn_max_age.")
+            config["OPTIONS"]["pool"] = pool
+        return config
     if scheme == "sqlite":
         db_path = (parsed.path or "").lstrip("/") or "db.sqlite3"
-        return {
+        pragmas = {key: options.pop(key, default) for key, default in SQLITE_PRAGMA_DEFAULTS.items()}
+        busy_timeout = _url_int("busy_timeout", options.pop("busy_timeout", "5000"))
+        transaction_mode = options.pop("transaction_mode", None)
+        _reject_unknown(options, scheme)
+        for key, value in pragmas.items():
+            if not value.replace("_", "").isalnum():
+                raise ImproperlyConfigured(f"Invalid value for DATABASE_URL option '{key}': '{value}'.")
+        config = {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / db_path,
+            "OPTIONS": {
+                "init_command": ";".join(f"PRAGMA {key} = {value}" for key, value in pragmas.items()),
+                # Seconds the driver waits on a locked database before raising.
+                "timeout": busy_timeout / 1000,
+            },
         }
+        if transaction_mode:
+            config["OPTIONS"]["transaction_mode"] = transaction_mode.upper()
+        return config
     raise ImproperlyConfigured(f"Unsupported DATABASE_URL scheme '{scheme}'.")
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if DATABASE_URL:
-    DATABASES = {"default": parse_database_url(DATABASE_URL)}
-else:
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
-        }
-    }
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
+DATABASES = {"default": parse_database_url(DATABASE_URL)}
+
+# Read replicas (products/routing.py): a comma-separated list of URLs in the
+# DATABASE_URL format. The product list, table and export read from them in
+# turn; writes, and a session's reads for DATABASE_REPLICA_STICKY_SECONDS
+# after it writes, stay on the primary. Tests run against the primary.
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", os.getenv("DATABASE_REPLICA_URL", "")).split(",")
+    if url.strip()
+]
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    alias = f"replica{index}"
+    DATABASES[alias] = {**parse_database_url(replica_url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["products.routing.ReplicaRouter"] if DATABASE_REPLICAS else []
+DATABASE_REPLICA_STICKY_SECONDS = float(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5"))
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "fragments": {
+        "BACKEND": os.getenv(
+            "FRAGMENT_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("FRAGMENT_CACHE_LOCATION", "product-fragments"),
+        "TIMEOUT": int(os.getenv("FRAGMENT_CACHE_TIMEOUT", "86400")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "20000")),
+        },
+    },
+    "results": {
+        "BACKEND": os.getenv(
+            "RESULT_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("RESULT_CACHE_LOCATION", "product-results"),
+        "TIMEOUT": int(os.getenv("RESULT_CACHE_TIMEOUT", "300")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500")),
+        },
+    },
+}
+
+# Cache alias holding rendered product rows and cards (see products/fragments.py).
+PRODUCT_FRAGMENT_CACHE = "fragments"
+# Cache alias holding first-page list results (see products/results.py).
+PRODUCT_RESULT_CACHE = "results"
 
 
 # Password validation
@@ -212,6 +356,55 @@ else:
     }
     DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
 
+# "sync" uploads product images inside the request; "async" spools them to
+# PRODUCT_IMAGE_SPOOL_ROOT and pushes them to STORAGES["default"] from a
+# background worker pool (see products/uploads.py).
+PRODUCT_IMAGE_UPLOAD_MODE = os.getenv("PRODUCT_IMAGE_UPLOAD_MODE", "sync").strip().lower()
+if PRODUCT_IMAGE_UPLOAD_MODE not in {"sync", "async"}:
+    raise ImproperlyConfigured("PRODUCT_IMAGE_UPLOAD_MODE must be 'sync' or 'async'.")
+PRODUCT_IMAGE_SPOOL_ROOT = Path(os.getenv("PRODUCT_IMAGE_SPOOL_ROOT", BASE_DIR / "spool"))
+PRODUCT_IMAGE_UPLOAD_WORKERS = int(os.getenv("PRODUCT_IMAGE_UPLOAD_WORKERS", "4"))
+PRODUCT_IMAGE_UPLOAD_MAX_PENDING = int(os.getenv("PRODUCT_IMAGE_UPLOAD_MAX_PENDING", "64"))
+PRODUCT_IMAGE_UPLOAD_RETRIES = int(os.getenv("PRODUCT_IMAGE_UPLOAD_RETRIES", "3"))
+# Limits products/upload_handlers.py enforces while an image streams in.
+PRODUCT_IMAGE_MAX_BYTES = int(os.getenv("PRODUCT_IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+PRODUCT_IMAGE_MAX_PIXELS = int(os.getenv("PRODUCT_IMAGE_MAX_PIXELS", "25000000"))
+
+# Request profiling (products/profiling.py): Server-Timing headers (for
+# staff, or everyone with DEBUG or PROFILING_SERVER_TIMING on), rolling
+# per-view stats for the last PROFILING_WINDOW requests, and a warning with
+# the slowest SQL for requests over PROFILING_SLOW_REQUEST_MS (0 disables it).
+PROFILING_SERVER_TIMING = env_bool("PROFILING_SERVER_TIMING", "False")
+PROFILING_SLOW_REQUEST_MS = int(os.getenv("PROFILING_SLOW_REQUEST_MS", "500"))
+PROFILING_WINDOW = int(os.getenv("PROFILING_WINDOW", "500"))
+PROFILING_MAX_STATEMENTS = int(os.getenv("PROFILING_MAX_STATEMENTS", "50"))
+
+# Search-box suggestions (products/typeahead.py): how many to show, how
+# often a worker checks whether another worker changed the catalog, and how
+# it catches up: rows changed since its last sync (overlapping by the
+# margin), unless there are more than TYPEAHEAD_MAX_SYNC_ROWS of them or the
+# deleted-id log no longer reaches back that far.
+TYPEAHEAD_LIMIT = int(os.getenv("TYPEAHEAD_LIMIT", "8"))
+TYPEAHEAD_VERSION_CHECK_SECONDS = float(os.getenv("TYPEAHEAD_VERSION_CHECK_SECONDS", "1"))
+TYPEAHEAD_SYNC_MARGIN_SECONDS = int(os.getenv("TYPEAHEAD_SYNC_MARGIN_SECONDS", "60"))
+TYPEAHEAD_MAX_SYNC_ROWS = int(os.getenv("TYPEAHEAD_MAX_SYNC_ROWS", "5000"))
+TYPEAHEAD_DELETION_RETENTION_SECONDS = int(os.getenv("TYPEAHEAD_DELETION_RETENTION_SECONDS", "86400"))
+
+# Live catalog change feed (products/events.py): "local" delivers events
+# within one process, "postgres" relays them between processes with
+# LISTEN/NOTIFY. Slow clients are told to reload once they fall
+# PRODUCT_EVENTS_QUEUE_SIZE events behind.
+PRODUCT_EVENTS_BACKEND = os.getenv("PRODUCT_EVENTS_BACKEND", "local")
+PRODUCT_EVENTS_QUEUE_SIZE = int(os.getenv("PRODUCT_EVENTS_QUEUE_SIZE", "100"))
+PRODUCT_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("PRODUCT_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Stock ledger (products/stock.py): writers spread each product's pending
+# quantity over STOCK_SHARDS counter rows that `manage.py fold_stock` folds
+# into Product.stock; the list's low-stock filter shows products at or
+# below INVENTORY_LOW_STOCK_THRESHOLD.
+STOCK_SHARDS = int(os.getenv("STOCK_SHARDS", "8"))
+INVENTORY_LOW_STOCK_THRESHOLD = int(os.getenv("INVENTORY_LOW_STOCK_THRESHOLD", "5"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -4,20 +4,41 @@ from django.contrib import admin
 from django.urls import path
 
 from products.views import (
+    AsyncProductListView,
+    AsyncProductTablePartialView,
+    ProductAutocompleteView,
+    ProductBulkActionView,
     ProductCreateView,
     ProductDeleteView,
+    ProductEventStreamView,
+    ProductExportView,
     ProductListView,
+    ProductRowPartialView,
+    ProductStockView,
     ProductTablePartialView,
     ProductUpdateView,
+    ProfilingStatsView,
 )
 
+if settings.INVENTORY_ASYNC_VIEWS:
+    list_view, table_view = AsyncProductListView, AsyncProductTablePartialView
+else:
+    list_view, table_view = ProductListView, ProductTablePartialView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("", ProductListView.as_view(), name="products-web-list"),
+    path("", list_view.as_view(), name="products-web-list"),
     path("new/", ProductCreateView.as_view(), name="products-web-new"),
     path("<uuid:pk>/edit/", ProductUpdateView.as_view(), name="products-web-edit"),
     path("<uuid:pk>/delete/", ProductDeleteView.as_view(), name="products-web-delete"),
-    path("table/", ProductTablePartialView.as_view(), name="products-web-table"),
+    path("<uuid:pk>/row/", ProductRowPartialView.as_view(), name="products-web-row"),
+    path("<uuid:pk>/stock/", ProductStockView.as_view(), name="products-web-stock"),
+    path("autocomplete/", ProductAutocompleteView.as_view(), name="products-web-autocomplete"),
+    path("bulk/", ProductBulkActionView.as_view(), name="products-web-bulk"),
+    path("events/", ProductEventStreamView.as_view(), name="products-web-events"),
+    path("export/", ProductExportView.as_view(), name="products-web-export"),
+    path("profiling/", ProfilingStatsView.as_view(), name="products-profiling"),
+    path("table/", table_view.as_view(), name="products-web-table"),
 ]
 
 if settings.DEBUG:
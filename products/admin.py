@@ -1,21 +1,94 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
-from .models import Product
+from .models import Product, StockMovement
+from .search import get_search_backend
+
+
+def estimated_count(queryset, cap: int) -> int:
+    """Row count that never scans a large table.
+
+    An unfiltered PostgreSQL table reports the planner's estimate from
+    ``pg_class.reltuples``. Everything else is counted exactly up to ``cap``
+    rows, and anything larger is reported as ``cap``.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 (or 0 on older servers) until the table is first analyzed.
+        if row and row[0] > cap:
+            return row[0]
+    return min(queryset.order_by()[: cap + 1].count(), cap)
+
+
+class EstimatedCountPaginator(Paginator):
+    count_cap = 10_000
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list, self.count_cap)
+
+
+class ScalableChangeListMixin:
+    """Changelist settings for tables too big to count, facet or search with ``LIKE``."""
+
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered count next to the filtered one.
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ("thumbnail", "name", "price", "created_at")
     search_fields = ("name",)
+    search_help_text = "Nomi bo‘yicha qidirish (so‘z boshlari)."
     list_filter = ("created_at",)
-    ordering = ("-created_at",)
+    # Both match an index; the trailing id keeps the order total without Django appending -pk.
+    ordering = ("-created_at", "id")
+    sortable_by = ("price", "created_at")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        # The same indexed lookup as the product list (FTS5 / tsvector) instead of icontains.
+        return get_search_backend(queryset.model, queryset.db).filter(queryset, search_term), False
 
     @admin.display(description="Image")
     def thumbnail(self, obj: Product):
-        if obj.image:
+        # Only the 48px variant; the original can be megabytes per row.
+        if obj.has_image_variants:
             return format_html(
-                '<img src="{}" style="height:40px;width:40px;object-fit:cover;border-radius:4px;" />',
-                obj.image.url,
+                '<img src="{}" width="40" height="40" loading="lazy" decoding="async" '
+                'style="object-fit:cover;border-radius:4px;" />',
+                obj.thumbnail_url,
             )
         return "-"
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+    """The ledger is append-only: movements are recorded from the product list."""
+
+    list_display = ("product", "kind", "quantity", "note", "created_at")
+    list_filter = ("kind",)
+    list_select_related = ("product",)
+    raw_id_fields = ("product",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using="default", **kwargs):
+    from django.db import connections
+
+    from .search import ensure_sqlite_search_index
+
+    connection = connections[using]
+    if connection.vendor == "sqlite" and "products_product" in connection.introspection.table_names():
+        ensure_sqlite_search_index(connection)
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "products"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(ensure_search_index, sender=self)
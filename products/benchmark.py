@@ -0,0 +1,255 @@
+"""Latency, query-count and memory benchmarks for the product views.
+
+``benchmark_catalog`` seeds ``size`` synthetic products into the current
+database with ``bulk_seed`` and drives the real URL stack through the test
+``Client``: the list page, the table partial (first page, a cursor halfway
+through the catalog, a search, ``sort=price`` and ``view=cards``) and the
+HTMX create, update and delete endpoints. Every scenario is timed over
+``iterations`` requests after one warm-up request; query counts come from a
+``connection.execute_wrapper`` so the timed runs do not pay for
+``CaptureQueriesContext``, and peak Python memory is taken from one extra
+request under ``tracemalloc``.
+
+``benchmark_concurrency`` instead keeps ``concurrency`` infinite-scroll
+requests in flight at once through the ASGI handler (``AsyncClient``) and
+reports throughput, which is what ``INVENTORY_ASYNC_VIEWS`` is meant to
+improve; run it once with the setting off and once with it on.
+
+``benchmark_row_rendering`` times one page of ``_row.html`` fragments
+rendered the old way (``render_to_string`` per row, labels from the template
+filters) against ``fragments.render_uncached``, without the fragment cache,
+and reports the cost per row.
+
+The ``benchmark_products`` command runs this against a throwaway test
+database per size and writes the results as JSON, so runs from different
+commits can be diffed.
+"""
+
+import asyncio
+import math
+import time
+import tracemalloc
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.template.loader import render_to_string
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .fragments import default_currency, get_fragment_cache, render_uncached
+from .models import Product
+from .pagination import KeysetPaginator
+from .seeding import bulk_seed, generate_products
+from .views import ProductQueryMixin
+
+HTMX_HEADERS = {"HTTP_HX_REQUEST": "true"}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def _deep_cursor(size: int) -> str | None:
+    ordering = ProductQueryMixin.sort_orderings["created"]
+    middle = Product.objects.order_by(*ordering).only(*[name.lstrip("-") for name in ordering])[size // 2 :]
+    product = middle.first()
+    if product is None:
+        return None
+    return KeysetPaginator(Product.objects.all(), 1, ordering).encode_cursor(product)
+
+
+class ViewBenchmark:
+    def __init__(self, client: Client, iterations: int, using: str = "default"):
+        self.client = client
+        self.iterations = iterations
+        self.connection = connections[using]
+
+    def measure(self, request) -> dict:
+        """Time ``request()``; it is called ``iterations + 2`` times in total."""
+        request()  # warm-up: template loading, first-query caches
+        timings = []
+        counter = QueryCounter()
+        statuses = set()
+        with self.connection.execute_wrapper(counter):
+            for _ in range(self.iterations):
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+        tracemalloc.start()
+        try:
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "iterations": self.iterations,
+            "p50_ms": round(percentile(timings, 0.50), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "queries": round(counter.count / self.iterations, 2),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "status_codes": sorted(statuses),
+        }
+
+    def get(self, url, params=None, htmx=False):
+        headers = HTMX_HEADERS if htmx else {}
+        return lambda: self._consume(self.client.get(url, params or {}, **headers))
+
+    @staticmethod
+    def _consume(response):
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+
+def benchmark_catalog(size: int, iterations: int = 20, seed: int = 0, using: str = "default") -> dict:
+    seeded = bulk_seed(size, seed=seed, using=using)
+    get_fragment_cache().clear()
+
+    user, _ = get_user_model().objects.get_or_create(username="benchmark")
+    client = Client()
+    client.force_login(user)
+    bench = ViewBenchmark(client, iterations, using)
+
+    table = reverse("products-web-table")
+    scenarios = {
+        "list": bench.get(reverse("products-web-list")),
+        "table_first_page": bench.get(table, htmx=True),
+        "table_search": bench.get(table, {"q": "chocolate"}, htmx=True),
+        "table_sort_price": bench.get(table, {"sort": "price"}, htmx=True),
+        "table_cards": bench.get(table, {"view": "cards"}, htmx=True),
+    }
+    cursor = _deep_cursor(size)
+    if cursor:
+        scenarios["table_deep_page"] = bench.get(table, {"cursor": cursor}, htmx=True)
+
+    results = {name: bench.measure(request) for name, request in scenarios.items()}
+    results.update(_benchmark_writes(bench, client))
+    return {
+        "size": size,
+        "seed_seconds": round(seeded.elapsed, 3),
+        "seed_rows_per_second": round(seeded.rows_per_second),
+        "scenarios": results,
+    }
+
+
+def benchmark_row_rendering(rows: int = 15, iterations: int = 200, template_name: str = "products/_row.html") -> dict:
+    """Per-row render cost of a page of ``rows`` unsaved products, in microseconds."""
+    products = list(generate_products(rows, days=3))
+    currency = default_currency()
+
+    def per_row_filters():
+        return [render_to_string(template_name, {"product": product, "currency": currency}) for product in products]
+
+    def batched():
+        return render_uncached(products, template_name, currency, timezone.localdate())
+
+    results = {}
+    for name, render in (("per_row_filters", per_row_filters), ("batched", batched)):
+        render()  # warm-up: template compilation
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1_000_000 / rows)
+        results[name] = {
+            "p50_us_per_row": round(percentile(timings, 0.50), 2),
+            "p95_us_per_row": round(percentile(timings, 0.95), 2),
+        }
+    results["rows"] = rows
+    results["iterations"] = iterations
+    results["speedup"] = round(results["per_row_filters"]["p50_us_per_row"] / results["batched"]["p50_us_per_row"], 2)
+    return results
+
+
+def _scroll_cursors(pages: int) -> list[str]:
+    ordering = ProductQueryMixin.sort_orderings["created"]
+    paginator = KeysetPaginator(Product.objects.all(), 15, ordering)
+    cursors, cursor = [""], None
+    for _ in range(pages - 1):
+        cursor = paginator.page(cursor).next_cursor
+        if cursor is None:
+            break
+        cursors.append(cursor)
+    return cursors
+
+
+def benchmark_concurrency(concurrency: int, requests_per_client: int = 5, pages: int = 20) -> dict:
+    """Fire ``concurrency * requests_per_client`` table requests, ``concurrency`` at a time."""
+    cursors = _scroll_cursors(pages)
+    user, _ = get_user_model().objects.get_or_create(username="benchmark")
+    table = reverse("products-web-table")
+
+    async def run():
+        client = AsyncClient()
+        await client.aforce_login(user)
+        gate = asyncio.Semaphore(concurrency)
+        timings = []
+        statuses = set()
+
+        async def scroll(index):
+            params = {"cursor": cursors[index % len(cursors)]} if index % len(cursors) else {}
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(table, params, headers={"HX-Request": "true"})
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(scroll(index) for index in range(concurrency * requests_per_client)))
+        return time.perf_counter() - started, timings, statuses
+
+    elapsed, timings, statuses = async_to_sync(run)()
+    return {
+        "async_views": settings.INVENTORY_ASYNC_VIEWS,
+        "concurrency": concurrency,
+        "requests": len(timings),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "status_codes": sorted(statuses),
+    }
+
+
+def _benchmark_writes(bench: ViewBenchmark, client: Client) -> dict:
+    names = (f"Benchmark product {index}" for index in range(10**9))
+
+    def create():
+        return client.post(reverse("products-web-new"), {"name": next(names), "price": "1234.50"}, **HTMX_HEADERS)
+
+    results = {"create": bench.measure(create)}
+    created = list(Product.objects.filter(name__startswith="Benchmark product ").values_list("pk", flat=True))
+    prices = (Decimal(1000 + index) for index in range(10**9))
+
+    def update():
+        return client.post(
+            reverse("products-web-edit", args=[created[0]]),
+            {"name": "Benchmark product (edited)", "price": str(next(prices))},
+            **HTMX_HEADERS,
+        )
+
+    results["update"] = bench.measure(update)
+    doomed = iter(created)
+
+    def delete():
+        return client.post(reverse("products-web-delete", args=[next(doomed)]), **HTMX_HEADERS)
+
+    results["delete"] = bench.measure(delete)
+    return results
@@ -0,0 +1,132 @@
+"""Content-addressed, reference-counted storage for product images.
+
+``Product.image`` stores each upload under the SHA-256 of its bytes
+(``products/<2 hex>/<sha256>.<ext>``), so identical supplier photos share
+one file, one set of resized variants and one CDN URL. ``store`` hashes the
+upload while streaming it and only talks to the storage when the blob is
+new: a blob with an ``ImageBlob`` row is known to exist and is not uploaded
+again; otherwise ``storage.exists`` (a ``HEAD`` on R2) catches files that
+outlived their row before anything is sent.
+
+``ImageBlob.refcount`` counts the products pointing at a blob. The
+``products.signals`` receivers (and ``products.bulk`` for batches) acquire
+the new image and release the old one in the product write's transaction.
+A blob that drops to zero is deleted, with its variants, after that
+transaction commits, and only if nothing picked it up again in between.
+
+Images stored before content addressing keep their old names. They have no
+row and are never reference counted; their variants are removed when the
+last product using the image lets go of it.
+"""
+
+import hashlib
+import posixpath
+import re
+from collections import Counter
+
+from django.db import router, transaction
+from django.db.models import F
+
+from .images import build_image_variants, delete_image_variants
+from .models import ImageBlob, Product
+from .upload_handlers import sniff_format
+
+HASH_CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+_BLOB_NAME_RE = re.compile(r"(?:^|/)[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+def is_blob_name(name: str) -> bool:
+    return bool(name) and bool(_BLOB_NAME_RE.search(name))
+
+
+def blob_name(prefix: str, content, original_name: str) -> str:
+    """The content-addressed name for ``content``, which is left rewound."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    head = b""
+    for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b""):
+        head = head or chunk[:16]
+        digest.update(chunk)
+    content.seek(0)
+    extension = EXTENSIONS.get(sniff_format(head)) or posixpath.splitext(original_name)[1].lower()
+    hexdigest = digest.hexdigest()
+    return posixpath.join(prefix, hexdigest[:2], f"{hexdigest}{extension}")
+
+
+def store(storage, prefix: str, content, original_name: str, using: str | None = None) -> str:
+    """Save ``content`` unless an identical blob already exists; returns its name."""
+    using = using or router.db_for_write(ImageBlob)
+    name = blob_name(prefix, content, original_name)
+    with transaction.atomic(using=using):
+        # The lock (held until the caller's transaction ends) keeps _delete_unused off a blob being reused.
+        if ImageBlob.objects.using(using).select_for_update().filter(name=name).exists():
+            return name
+        if not storage.exists(name):
+            stored = storage.save(name, content)
+            if stored != name:
+                # Lost a race with an identical upload; keep the canonical copy.
+                storage.delete(stored)
+        size = getattr(content, "size", None) or storage.size(name)
+        ImageBlob.objects.using(using).bulk_create([ImageBlob(name=name, size=size)], ignore_conflicts=True)
+    return name
+
+
+def get_variants(field_file, using: str, source=None) -> dict:
+    """Variants of ``field_file``, built once per blob and shared by every product using it."""
+    if not is_blob_name(field_file.name):
+        return build_image_variants(field_file, source=source)
+    known = ImageBlob.objects.using(using).filter(name=field_file.name).values_list("variants", flat=True).first()
+    if known:
+        return known
+    variants = build_image_variants(field_file, source=source)
+    ImageBlob.objects.using(using).filter(name=field_file.name).update(variants=variants)
+    return variants
+
+
+def acquire(name: str, using: str) -> None:
+    if not is_blob_name(name):
+        return
+    blobs = ImageBlob.objects.using(using).filter(name=name)
+    if not blobs.update(refcount=F("refcount") + 1):
+        # The row went missing (rolled back, or deleted while unused): the file may still be there.
+        ImageBlob.objects.using(using).bulk_create([ImageBlob(name=name, size=0)], ignore_conflicts=True)
+        blobs.update(refcount=F("refcount") + 1)
+
+
+def release(storage, images, using: str) -> None:
+    """Drop one reference per ``(name, variants)`` pair in ``images``.
+
+    Call inside the write's transaction; unused blobs are deleted once it
+    commits. Legacy images only lose their variants, once no product uses them.
+    """
+    counts = Counter()
+    legacy_variants = {}
+    for name, variants in images:
+        if is_blob_name(name):
+            counts[name] += 1
+        elif variants:
+            legacy_variants[variants.get("source") or name] = variants
+    blobs = ImageBlob.objects.using(using)
+    for count in set(counts.values()):
+        names = [name for name, n in counts.items() if n == count]
+        blobs.filter(name__in=names, refcount__gte=count).update(refcount=F("refcount") - count)
+    if counts or legacy_variants:
+        transaction.on_commit(lambda: _delete_unused(storage, list(counts), legacy_variants, using), using=using)
+
+
+def _delete_unused(storage, names, legacy_variants, using: str) -> None:
+    # Legacy files are not counted, but may still be shared (seeded catalogs reuse a few placeholders).
+    in_use = set(Product.objects.using(using).filter(image__in=legacy_variants).values_list("image", flat=True))
+    for name, variants in legacy_variants.items():
+        if name not in in_use:
+            delete_image_variants(storage, variants)
+    for name in names:
+        with transaction.atomic(using=using):
+            blob = ImageBlob.objects.using(using).filter(name=name, refcount=0).select_for_update().first()
+            if blob is None:
+                continue
+            # Files go first, under the lock, so a concurrent ``store`` never trusts a file that is about to vanish.
+            storage.delete(name)
+            delete_image_variants(storage, blob.variants)
+            blob.delete()
@@ -0,0 +1,80 @@
+"""Edits applied to a selection of products at once.
+
+Each action is a single ``QuerySet.update`` or ``QuerySet.delete`` in one
+transaction, however many products are selected. The per-product work that
+``products.signals`` normally does is done once for the whole batch instead:
+one catalog stats update computed from the selected rows (which bumps the
+catalog version by exactly one, so the typeahead index applies the batch as
+a single version step; only a batch that touched the cheapest, dearest or
+newest product re-reads that edge through its index), one
+``delete_many`` for the cached fragments, one ``reload`` event on the live
+feed (``products.events``), and, for deletes, one ``blobs.release`` for the
+images of every deleted product.
+
+Adjusted prices are rounded to the field's two decimals and clamped to the
+range the column can hold, so a large increase cannot overflow it and a
+large decrease stops at zero.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least, Round
+from django.utils import timezone
+
+from . import blobs, events, stats, typeahead
+from .fragments import invalidate_fragments
+from .models import Product
+from .signals import suppress_product_signals
+from .stock import with_on_hand
+
+DELETE = "delete"
+SET_PRICE = "set_price"
+ADJUST_PERCENT = "adjust_percent"
+ADJUST_AMOUNT = "adjust_amount"
+
+_price_field = Product._meta.get_field("price")
+MAX_PRICE = Decimal(10 ** (_price_field.max_digits - _price_field.decimal_places)) - Decimal("0.01")
+
+
+def bulk_delete(pks, using: str = "default") -> int:
+    products = Product.objects.using(using).filter(pk__in=pks)
+    with transaction.atomic(using=using):
+        rows = list(
+            with_on_hand(products).values_list("pk", "updated_at", "on_hand", "price", "image", "image_variants")
+        )
+        with suppress_product_signals():
+            products.delete()
+        stats.record_deleted_many([(pk, price) for pk, _, _, price, *_ in rows], using=using)
+        typeahead.record_writes([(pk, None) for pk, *_ in rows], using=using)
+        events.publish(events.RELOAD, using=using)
+        storage = Product._meta.get_field("image").storage
+        blobs.release(storage, [(image, variants) for *_, image, variants in rows if image or variants], using=using)
+    invalidate_fragments((pk, updated_at, on_hand) for pk, updated_at, on_hand, *_ in rows)
+    return len(rows)
+
+
+def bulk_update_price(pks, action: str, value: Decimal, using: str = "default") -> int:
+    """Set the price to ``value``, or add ``value`` percent or ``value`` to it."""
+    if action == SET_PRICE:
+        price = Value(value)
+    elif action == ADJUST_PERCENT:
+        price = Round(F("price") * Value((100 + value) / 100), 2)
+    elif action == ADJUST_AMOUNT:
+        price = F("price") + Value(value)
+    else:
+        raise ValueError(f"Unknown price action: {action!r}")
+    price = Least(Greatest(price, Value(Decimal("0"))), Value(MAX_PRICE))
+    products = Product.objects.using(using).filter(pk__in=pks)
+    with transaction.atomic(using=using):
+        rows = list(with_on_hand(products).values_list("pk", "updated_at", "on_hand", "price"))
+        updated = products.update(price=price, updated_at=timezone.now())
+        new_prices = dict(products.values_list("pk", "price"))
+        stats.record_price_changes([(previous, new_prices[pk]) for pk, *_, previous in rows], using=using)
+        # Names are unchanged; this only moves the index to the new version.
+        typeahead.record_writes([], using=using)
+        events.publish(events.RELOAD, using=using)
+    invalidate_fragments((pk, updated_at, on_hand) for pk, updated_at, on_hand, _ in rows)
+    return updated
+
@@ -0,0 +1,182 @@
+"""Live catalog change feed.
+
+``products.signals`` publishes a ``ProductEvent`` for every product save and
+delete, and ``products.bulk`` publishes one ``reload`` event per batch. The
+``products-web-events`` view streams them to browsers as Server-Sent Events
+from an async view, so an open connection costs a queue rather than a
+worker thread under ASGI. Each event carries the catalog version
+(``products.stats``) of the write. A client that sees the version skip knows
+it missed something and reloads the table; otherwise it patches the single
+row or card.
+
+How events reach subscribers is up to the backend named by
+``PRODUCT_EVENTS_BACKEND``:
+
+* ``local`` delivers committed events to subscribers in the same process.
+  That is enough for a single ASGI worker and for the tests.
+* ``postgres`` publishes with ``pg_notify`` inside the write's transaction
+  (PostgreSQL only delivers it if the transaction commits). Every process
+  runs one ``LISTEN`` connection that relays notifications to its local
+  subscribers.
+
+A dotted path to any class with the same ``publish``/``subscribe``/
+``unsubscribe`` methods also works.
+
+A subscriber that falls ``PRODUCT_EVENTS_QUEUE_SIZE`` events behind gets one
+``reload`` event in place of its backlog.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+from . import stats
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+RELOAD = "reload"
+
+
+@dataclass(frozen=True)
+class ProductEvent:
+    kind: str
+    version: int
+    id: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "ProductEvent":
+        return cls(**json.loads(payload))
+
+    def to_sse(self) -> str:
+        return f"id: {self.version}\nevent: product\ndata: {self.to_json()}\n\n"
+
+
+class Subscription:
+    """One connected client: a bounded queue owned by the client's event loop."""
+
+    def __init__(self, maxsize: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, event: ProductEvent) -> None:
+        # Runs on self.loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to patch row by row: drop the backlog, ask for a reload.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(ProductEvent(RELOAD, version=event.version))
+
+    async def get(self) -> ProductEvent:
+        return await self.queue.get()
+
+
+class LocalBackend:
+    """Delivers committed events to the subscribers of this process."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event: ProductEvent, using: str = "default") -> None:
+        transaction.on_commit(lambda: self.deliver(event), using=using)
+
+    def deliver(self, event: ProductEvent) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # The loop is closed; the stream's cleanup will unsubscribe it.
+                pass
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(getattr(settings, "PRODUCT_EVENTS_QUEUE_SIZE", 100))
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class PostgresBackend(LocalBackend):
+    """Relays events between processes with ``LISTEN``/``NOTIFY``."""
+
+    channel = "product_events"
+    reconnect_delay = 1.0
+
+    def __init__(self, using: str = "default"):
+        super().__init__()
+        self.using = using
+        self._listener = None
+
+    def publish(self, event: ProductEvent, using: str = "default") -> None:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, event.to_json()])
+
+    def subscribe(self) -> Subscription:
+        subscription = super().subscribe()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not subscription.loop:
+            self._listener = subscription.loop.create_task(self._listen())
+        return subscription
+
+    def connection_params(self) -> dict:
+        params = connections[self.using].get_connection_params()
+        # Django's sync cursor class and pool options do not apply to this connection.
+        for key in ("cursor_factory", "pool"):
+            params.pop(key, None)
+        return params
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        while True:
+            try:
+                connection = await psycopg.AsyncConnection.connect(autocommit=True, **self.connection_params())
+                async with connection:
+                    await connection.execute(f"LISTEN {self.channel}")
+                    async for notify in connection.notifies():
+                        self.deliver(ProductEvent.from_json(notify.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Product event listener lost its connection; reconnecting.", exc_info=True)
+                await asyncio.sleep(self.reconnect_delay)
+
+
+BACKENDS = {"local": LocalBackend, "postgres": PostgresBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, "PRODUCT_EVENTS_BACKEND", "local")
+            backend_class = BACKENDS.get(name) or import_string(name)
+            _backend = backend_class()
+        return _backend
+
+
+def publish(kind: str, pk=None, using: str = "default") -> None:
+    """Publish a write; called inside its transaction, after the stats update."""
+    event = ProductEvent(kind, version=stats.get_version(using=using), id=str(pk or ""))
+    get_backend().publish(event, using=using)
@@ -0,0 +1,53 @@
+"""Price and date labels shown on product rows, cards and the stats block.
+
+The ``price_format`` and ``added_label`` template filters call these one
+value at a time. ``products.fragments`` renders a whole page of rows with
+``format_prices`` (one pass over the page's prices) and a single
+``DateLabels``, whose day boundaries are worked out once instead of
+converting ``now()`` and every ``created_at`` to local time per row.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+# Thousands are grouped with a non-breaking space so prices never wrap.
+THOUSANDS_SEPARATOR = "\xa0"
+
+
+def format_price(value) -> str:
+    if value is None:
+        return ""
+    return f"{int(value):,}".replace(",", THOUSANDS_SEPARATOR)
+
+
+def format_prices(values) -> list[str]:
+    """``format_price`` for many values, with one separator replacement for all of them."""
+    values = list(values)
+    if not values:
+        return []
+    grouped = "\n".join("" if value is None else f"{int(value):,}" for value in values)
+    return grouped.replace(",", THOUSANDS_SEPARATOR).split("\n")
+
+
+class DateLabels:
+    """Labels a timestamp "Bugun", "Kecha" or ``dd.mm.YYYY`` relative to local ``today``."""
+
+    def __init__(self, today=None):
+        today = today or timezone.localdate()
+        self.today_start = self._midnight(today)
+        self.yesterday_start = self._midnight(today - timedelta(days=1))
+        self.tomorrow_start = self._midnight(today + timedelta(days=1))
+
+    @staticmethod
+    def _midnight(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def __call__(self, created_at) -> str:
+        if not created_at:
+            return ""
+        if self.today_start <= created_at < self.tomorrow_start:
+            return "Bugun"
+        if self.yesterday_start <= created_at < self.today_start:
+            return "Kecha"
+        return timezone.localtime(created_at).strftime("%d.%m.%Y")
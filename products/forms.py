@@ -1,10 +1,16 @@
+import uuid
+
 from django import forms
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
 
-from .models import Product
+from . import bulk, stock
+from .models import Product, StockMovement
+from .upload_handlers import max_image_bytes
+from .uploads import is_async_upload_enabled, schedule_image_upload, spool_image
 
 
 class ProductForm(forms.ModelForm):
@@ -12,11 +18,132 @@ class ProductForm(forms.ModelForm):
         model = Product
         fields = ["name", "price", "image"]
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Files ImageUploadHandler dropped mid-upload, keyed by field name.
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            self.add_error(field if field in self.fields else None, message)
+        return cleaned_data
+
     def clean_image(self):
         image = self.cleaned_data.get("image", False)
         if image:
-            if image.size > 5 * 1024 * 1024:
+            if image.size > max_image_bytes():
                 raise ValidationError(_("Rasm hajmi 5MB dan oshmasligi kerak."))
             if image.content_type not in ["image/jpeg", "image/png", "image/webp"]:
                 raise ValidationError(_("Faqat jpeg, png, yoki webp rasm yuklang."))
         return image
+
+    def save(self, commit=True):
+        image = self.cleaned_data.get("image")
+        if not (commit and isinstance(image, UploadedFile) and is_async_upload_enabled()):
+            return super().save(commit)
+        # Keep the current image on the row until the background upload replaces it.
+        previous = self.initial.get("image")
+        self.instance.image = previous.name if previous else ""
+        self.instance.image_spool = spool_image(image)
+        self.instance.image_state = Product.ImageState.PENDING
+        product = super().save(commit)
+        schedule_image_upload(product)
+        return product
+
+
+class ProductImportForm(ProductForm):
+    """Per-row validation for ``import_products``: the web form's rules, minus the image."""
+
+    class Meta(ProductForm.Meta):
+        fields = ["name", "price"]
+
+
+class ProductSelectionField(forms.Field):
+    """The ``ids`` checkboxes of the bulk toolbar, as distinct product UUIDs."""
+
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        "invalid": _("Noto‘g‘ri mahsulot tanlandi."),
+        "too_many": _("Bir vaqtda ko‘pi bilan %(limit)s ta mahsulot tanlash mumkin."),
+    }
+
+    def __init__(self, *, max_items: int, **kwargs):
+        self.max_items = max_items
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            selected = list(dict.fromkeys(uuid.UUID(str(item)) for item in value))
+        except ValueError:
+            raise ValidationError(self.error_messages["invalid"], code="invalid")
+        if len(selected) > self.max_items:
+            raise ValidationError(
+                self.error_messages["too_many"], code="too_many", params={"limit": self.max_items}
+            )
+        return selected
+
+
+class ProductBulkActionForm(forms.Form):
+    ACTION_CHOICES = [
+        (bulk.SET_PRICE, _("Narxni belgilash")),
+        (bulk.ADJUST_PERCENT, _("Narxni foizga o‘zgartirish")),
+        (bulk.ADJUST_AMOUNT, _("Narxni summaga o‘zgartirish")),
+        (bulk.DELETE, _("O‘chirish")),
+    ]
+
+    ids = ProductSelectionField(max_items=1000, error_messages={"required": _("Hech narsa tanlanmagan.")})
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    value = forms.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get("action")
+        value = cleaned_data.get("value")
+        if action in (None, bulk.DELETE):
+            return cleaned_data
+        if value is None:
+            self.add_error("value", _("Qiymat kiriting."))
+        elif action == bulk.SET_PRICE and value < 0:
+            self.add_error("value", _("Narx manfiy bo‘lishi mumkin emas."))
+        elif action == bulk.ADJUST_PERCENT and value <= -100:
+            self.add_error("value", _("Foiz -100 dan katta bo‘lishi kerak."))
+        return cleaned_data
+
+    def save(self, using: str = "default") -> int:
+        """Apply the action; returns how many products it touched."""
+        ids = self.cleaned_data["ids"]
+        action = self.cleaned_data["action"]
+        if action == bulk.DELETE:
+            return bulk.bulk_delete(ids, using=using)
+        return bulk.bulk_update_price(ids, action, self.cleaned_data["value"], using=using)
+
+
+class StockMovementForm(forms.Form):
+    kind = forms.ChoiceField(choices=StockMovement.Kind.choices)
+    quantity = forms.IntegerField()
+    note = forms.CharField(max_length=255, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        kind = cleaned_data.get("kind")
+        quantity = cleaned_data.get("quantity")
+        if kind is None or quantity is None:
+            return cleaned_data
+        if kind == StockMovement.Kind.ADJUST:
+            if quantity == 0:
+                self.add_error("quantity", _("Tuzatish nolga teng bo‘lishi mumkin emas."))
+        elif quantity <= 0:
+            self.add_error("quantity", _("Miqdor musbat bo‘lishi kerak."))
+        return cleaned_data
+
+    def save(self, product, using: str = "default") -> StockMovement:
+        return stock.record_movement(
+            product.pk,
+            self.cleaned_data["kind"],
+            self.cleaned_data["quantity"],
+            note=self.cleaned_data["note"],
+            using=using,
+        )
@@ -0,0 +1,111 @@
+"""Rendered-HTML cache for product rows and cards.
+
+A fragment depends on the product row (``updated_at`` moves on every save),
+its on-hand stock (``products.stock`` never touches the row), the display
+currency, the template, and the local date, because ``added_label`` prints
+"Bugun"/"Kecha" relative to today. All of them are
+part of the key, so a stale fragment can never be served; receivers in
+``products.signals`` also delete the superseded entries eagerly so they do
+not wait for eviction. Lookups for a whole page go through one
+``get_many``/``set_many`` round trip.
+
+The backing cache is the ``CACHES`` alias named by
+``PRODUCT_FRAGMENT_CACHE``; its ``MAX_ENTRIES`` bounds memory use.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .formatting import DateLabels, format_prices
+
+FRAGMENT_TEMPLATES = ("products/_row.html", "products/_card.html")
+
+
+def get_fragment_cache():
+    return caches[getattr(settings, "PRODUCT_FRAGMENT_CACHE", "default")]
+
+
+def default_currency() -> str:
+    return getattr(settings, "INVENTORY_CURRENCY", "UZS")
+
+
+def fragment_key(product, template_name: str, currency: str, today=None, updated_at=None) -> str:
+    updated_at = updated_at or product.updated_at
+    today = today or timezone.localdate()
+    return _key(product.pk, updated_at, template_name, currency, today, getattr(product, "on_hand", None))
+
+
+def _key(pk, updated_at, template_name: str, currency: str, today, on_hand=None) -> str:
+    return ":".join(
+        [
+            "product-fragment",
+            template_name,
+            str(pk),
+            f"{updated_at.timestamp():.6f}",
+            currency,
+            today.isoformat(),
+            str(on_hand),
+        ]
+    )
+
+
+def render_product_fragments(products, template_name: str, currency: str) -> str:
+    products = list(products)
+    if not products:
+        return ""
+    cache = get_fragment_cache()
+    today = timezone.localdate()
+    keys = [fragment_key(product, template_name, currency, today) for product in products]
+    cached = cache.get_many(keys)
+    misses = [(key, product) for key, product in zip(keys, products) if key not in cached]
+    if misses:
+        rendered = render_uncached([product for _, product in misses], template_name, currency, today)
+        missing = {key: html for (key, _), html in zip(misses, rendered)}
+        cache.set_many(missing)
+        cached.update(missing)
+    return mark_safe("".join(cached[key] for key in keys))
+
+
+def render_uncached(products, template_name: str, currency: str, today=None) -> list[str]:
+    """Render one fragment per product, with labels computed for the whole batch.
+
+    The template is looked up once, and the price and date labels are passed
+    in as ``price_text`` and ``added_text`` so the per-row filters are skipped.
+    """
+    template = get_template(template_name)
+    date_labels = DateLabels(today)
+    prices = format_prices(product.price for product in products)
+    return [
+        template.render(
+            {
+                "product": product,
+                "currency": currency,
+                "price_text": price,
+                "added_text": date_labels(product.created_at),
+            }
+        )
+        for product, price in zip(products, prices)
+    ]
+
+
+def invalidate_product_fragments(product, updated_at=None, on_hand=None) -> None:
+    if on_hand is None:
+        on_hand = getattr(product, "on_hand", None)
+    invalidate_fragments([(product.pk, updated_at or product.updated_at, on_hand)])
+
+
+def invalidate_fragments(entries) -> None:
+    """Delete the fragments of every ``(pk, updated_at, on_hand)`` in one round trip."""
+    today = timezone.localdate()
+    currency = default_currency()
+    keys = [
+        _key(pk, updated_at, template_name, currency, today, on_hand)
+        for pk, updated_at, on_hand in entries
+        if updated_at is not None
+        for template_name in FRAGMENT_TEMPLATES
+    ]
+    if keys:
+        get_fragment_cache().delete_many(keys)
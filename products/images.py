@@ -0,0 +1,95 @@
+"""Derived image variants for ``Product.image``.
+
+Uploads can be up to 5 MB, while the table shows a 48px square. When a new
+image is saved we resize it once with Pillow into a few fixed sizes, each in
+WebP and in a widely supported fallback format, and store them next to the
+original through the product's storage (local disk or R2, whichever
+``STORAGES["default"]`` is). The resulting names are kept on
+``Product.image_variants`` so rendering never has to ask the storage what
+exists.
+"""
+
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# name -> (longest edge in px, crop to a square)
+IMAGE_VARIANTS = {
+    "thumb": (96, True),
+    "card": (192, True),
+    "full": (1200, False),
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def variant_name(original: str, variant: str, extension: str) -> str:
+    root, _ = posixpath.splitext(original)
+    return f"{root}__{variant}.{extension}"
+
+
+def _fallback_format(image: Image.Image, source_format: str | None) -> str:
+    if source_format == "PNG" or image.mode == "RGBA":
+        return "PNG"
+    return "JPEG"
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif image_format == "WEBP":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def build_image_variants(field_file, source=None) -> dict:
+    """Resize ``field_file`` into every variant and store them beside it.
+
+    ``source`` may be any readable file holding the same bytes (for example a
+    local copy) to avoid reading the original back from remote storage.
+    """
+    storage = field_file.storage
+    original = field_file.name
+    handle = source if source is not None else field_file.open("rb")
+    try:
+        handle.seek(0)
+        with Image.open(handle) as opened:
+            source_format = opened.format
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    finally:
+        if source is None:
+            field_file.close()
+
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    fallback = _fallback_format(image, source_format)
+
+    variants = {"source": original}
+    for variant, (edge, square) in IMAGE_VARIANTS.items():
+        if square:
+            resized = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        stored = {"width": resized.width}
+        for key, image_format in (("webp", "WEBP"), ("fallback", fallback)):
+            extension = "jpg" if image_format == "JPEG" else image_format.lower()
+            name = variant_name(original, variant, extension)
+            stored[key] = storage.save(name, ContentFile(_encode(resized, image_format)))
+        variants[variant] = stored
+    return variants
+
+
+def delete_image_variants(storage, variants: dict) -> None:
+    for variant in IMAGE_VARIANTS:
+        for name in (variants.get(variant) or {}).values():
+            if isinstance(name, str):
+                storage.delete(name)
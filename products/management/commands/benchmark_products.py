@@ -0,0 +1,101 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from products.benchmark import benchmark_catalog, benchmark_concurrency, benchmark_row_rendering
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway test databases with synthetic catalogs of the given sizes and report "
+        "p50/p95 latency, query count and peak memory for the product views as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=DEFAULT_SIZES,
+            help="Catalog sizes to benchmark (default: 1000 100000 1000000).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Timed requests per scenario (default: 20).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the synthetic catalog (default: 0).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=0,
+            help=(
+                "Also keep this many table requests in flight through the ASGI handler and report "
+                "throughput. Compare runs with INVENTORY_ASYNC_VIEWS off and on (default: 0, skip)."
+            ),
+        )
+        parser.add_argument(
+            "--label",
+            default="",
+            help="Free-form label stored with the results, e.g. a commit hash.",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Write the JSON report to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        report = {
+            "label": options["label"],
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "iterations": options["iterations"],
+            "results": [],
+        }
+        setup_test_environment()
+        try:
+            report["row_rendering"] = benchmark_row_rendering(iterations=max(options["iterations"], 50))
+            for size in options["sizes"]:
+                self.stderr.write(f"Benchmarking {size:,} products...")
+                report["results"].append(self.run_size(size, options))
+        finally:
+            teardown_test_environment()
+
+        payload = json.dumps(report, indent=2)
+        if options["output"] == "-":
+            self.stdout.write(payload)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+    def run_size(self, size, options):
+        # A fresh test database per size keeps runs independent of each other
+        # and of whatever is in the real database.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            result = benchmark_catalog(size, iterations=options["iterations"], seed=options["seed"])
+            if options["concurrency"]:
+                result["concurrent_scroll"] = benchmark_concurrency(options["concurrency"])
+            return result
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from products import stock
+
+
+class Command(BaseCommand):
+    help = "Fold pending stock counter shards into each product's stock column."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to fold (default: default).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Shards folded per transaction (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        folded = stock.fold(batch_size=options["batch_size"], using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} stock shard(s)."))
@@ -0,0 +1,149 @@
+import csv
+import json
+import sys
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from products import events, stats
+from products.forms import ProductImportForm
+from products.models import Product
+from products.search import deferred_search_index, normalize_search_text
+
+FORMATS = ("csv", "jsonl")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream products from a CSV or JSON Lines file (or stdin) and upsert them in batches. "
+        "Rows carry name and price, plus an optional id to update an existing product."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path to the file to import, or '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: guessed from the file extension, csv for stdin).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows to upsert per query and transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to import into (default: default).",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="How many rejected rows to describe on stderr (default: 20).",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        input_format = options["format"] or self.guess_format(source)
+        self.using = options["database"]
+        self.max_errors = options["max_errors"]
+        self.created = self.updated = self.rejected = 0
+
+        stream = self.open_source(source)
+        try:
+            rows = self.read_rows(stream, input_format)
+            with deferred_search_index(connections[self.using]):
+                self.import_rows(rows, options["batch_size"])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        with transaction.atomic(using=self.using):
+            stats.rebuild(using=self.using)
+            # One reload for the whole import, as for bulk actions: open lists refetch once.
+            events.publish(events.RELOAD, using=self.using)
+
+        message = f"Created {self.created}, updated {self.updated}, rejected {self.rejected} row(s)."
+        style = self.style.WARNING if self.rejected else self.style.SUCCESS
+        self.stdout.write(style(message))
+
+    def guess_format(self, source: str) -> str:
+        if source.lower().endswith((".jsonl", ".ndjson")):
+            return "jsonl"
+        return "csv"
+
+    def open_source(self, source: str):
+        if source == "-":
+            return sys.stdin
+        try:
+            return open(source, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(f"Cannot open {source}: {exc}") from exc
+
+    def read_rows(self, stream, input_format: str):
+        """Yield ``(line_number, row_dict_or_None)``; ``None`` marks an unparseable line."""
+        if input_format == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+    def import_rows(self, rows, batch_size: int) -> None:
+        batch = {}
+        for line_number, row in rows:
+            product = self.build_product(line_number, row)
+            if product is None:
+                continue
+            # Later rows for the same id win, and the batch never repeats a key.
+            batch[product.pk] = product
+            if len(batch) >= batch_size:
+                self.flush(batch)
+                batch = {}
+        if batch:
+            self.flush(batch)
+
+    def build_product(self, line_number: int, row):
+        if row is None:
+            return self.reject(line_number, "not a JSON object")
+        form = ProductImportForm(data={"name": row.get("name"), "price": row.get("price")})
+        if not form.is_valid():
+            errors = "; ".join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+            return self.reject(line_number, errors)
+        raw_id = str(row.get("id") or "").strip()
+        try:
+            product_id = uuid.UUID(raw_id) if raw_id else uuid.uuid4()
+        except ValueError:
+            return self.reject(line_number, f"id: '{raw_id}' is not a UUID")
+        product = form.instance
+        product.pk = product_id
+        product.search_name = normalize_search_text(product.name)[:255]
+        return product
+
+    def reject(self, line_number: int, reason: str):
+        self.rejected += 1
+        if self.rejected <= self.max_errors:
+            self.stderr.write(f"Line {line_number}: {reason}")
+        return None
+
+    def flush(self, batch: dict) -> None:
+        manager = Product.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            existing = set(manager.filter(pk__in=batch.keys()).values_list("pk", flat=True))
+            manager.bulk_create(
+                batch.values(),
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["name", "search_name", "price", "updated_at"],
+            )
+        self.updated += len(existing)
+        self.created += len(batch) - len(existing)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from products import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the catalog summary row from the products table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to rebuild (default: default).",
+        )
+
+    def handle(self, *args, **options):
+        summary = stats.rebuild(using=options["database"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Catalog stats rebuilt: {summary.total} product(s), "
+                f"prices {summary.price_min}–{summary.price_max}."
+            )
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from products.models import Product
+from products.search import ensure_sqlite_search_index, normalize_search_text
+
+
+class Command(BaseCommand):
+    help = "Re-normalize product search names and rebuild the full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to rebuild (default: default).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows to update per query (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        batch_size = options["batch_size"]
+        updated = 0
+
+        with transaction.atomic(using=using):
+            batch = []
+            products = Product.objects.using(using).only("id", "name", "search_name")
+            for product in products.iterator(chunk_size=batch_size):
+                search_name = normalize_search_text(product.name)[:255]
+                if search_name == product.search_name:
+                    continue
+                product.search_name = search_name
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    updated += Product.objects.using(using).bulk_update(batch, ["search_name"])
+                    batch = []
+            if batch:
+                updated += Product.objects.using(using).bulk_update(batch, ["search_name"])
+
+            connection = connections[using]
+            if connection.vendor == "sqlite":
+                ensure_sqlite_search_index(connection, force=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Re-normalized {updated} product(s); search index rebuilt.")
+        )
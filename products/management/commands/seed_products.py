@@ -4,59 +4,7 @@ from random import uniform
 from django.core.management.base import BaseCommand
 
 from products.models import Product
-
-
-PRODUCT_CATALOG = [
-    "Sea Salt Caramels",
-    "Dark Chocolate Hazelnuts",
-    "Milk Chocolate Truffles",
-    "Peanut Butter Bites",
-    "Sour Raspberry Gummies",
-    "Rainbow Lollipops",
-    "Mini Marshmallow Packs",
-    "Vanilla Fudge Squares",
-    "Almond Toffee Crunch",
-    "Gummy Bear Mix",
-    "Assorted Macarons",
-    "Chocolate Covered Espresso Beans",
-    "Fruit Leather Strips",
-    "Honey Roasted Cashews",
-    "Maple Pecan Brittle",
-    "Caramel Popcorn Bags",
-    "Peppermint Bark",
-    "Strawberry Cream Taffy",
-    "Chocolate Chip Cookies",
-    "Cocoa Powder Tin",
-    "Baking Soda Canister",
-    "Sea Salt Grinder",
-    "Herb Scissors",
-    "Stainless Mixing Bowls",
-    "Silicone Spatula Set",
-    "Cast Iron Skillet",
-    "Reusable Piping Bags",
-    "Decorative Sprinkles Mix",
-    "Vanilla Bean Paste",
-    "Organic Cane Sugar",
-    "Brownie Mix Pouches",
-    "Mini Rolling Pins",
-    "Kitchen Shears",
-    "Rechargeable Batteries AA (8 pack)",
-    "Rechargeable Batteries AAA (8 pack)",
-    "Colorful Measuring Spoons",
-    "Mini Storage Jars",
-    "Ceramic Dessert Plates",
-    "Reusable Bento Boxes",
-    "Lunch Bag Coolers",
-    "Kid-Friendly Water Bottles",
-    "Silicone Ice Pop Molds",
-    "Chocolate Drizzle Sauce",
-    "Butterscotch Syrup",
-    "Whipped Cream Chargers",
-    "Decorative Gift Tins",
-    "Party Favor Bags",
-    "Confetti Cupcake Kits",
-    "Chocolate Fountain Refills",
-]
+from products.seeding import PRODUCT_CATALOG, bulk_seed
 
 
 class Command(BaseCommand):
@@ -69,8 +17,39 @@ class Command(BaseCommand):
             default=len(PRODUCT_CATALOG),
             help="Number of products to seed (default: full catalog).",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Generate --count synthetic products with bulk_create instead of the curated catalog.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk_create batch and transaction (default: 5000).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; the same seed always yields the same catalog (default: 0).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Spread created_at over this many past days (default: 365).",
+        )
+        parser.add_argument(
+            "--with-images",
+            action="store_true",
+            help="Attach one of a few shared placeholder images to every product.",
+        )
 
     def handle(self, *args, **options):
+        if options["bulk"]:
+            return self.handle_bulk(**options)
+
         target_count = options["count"]
         created = 0
 
@@ -92,3 +71,25 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f"Seeded {created} product(s) out of requested {target_count}.")
         )
+
+    def handle_bulk(self, **options):
+        target_count = options["count"]
+
+        def report(created, elapsed):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {created}/{target_count} rows, {created / elapsed:,.0f} rows/s")
+
+        result = bulk_seed(
+            target_count,
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            days=options["days"],
+            with_images=options["with_images"],
+            progress=report,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {result.created} product(s) in {result.elapsed:.1f}s "
+                f"({result.rows_per_second:,.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_alter_product_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-created_at", "id"], name="product_created_keyset_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-price", "-created_at", "id"], name="product_price_keyset_idx"),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+from products.search import install_search_index, normalize_search_text, uninstall_search_index
+
+
+def populate_search_name(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    batch = []
+    for product in Product.objects.only("id", "name").iterator(chunk_size=2000):
+        product.search_name = normalize_search_text(product.name)[:255]
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ["search_name"])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ["search_name"])
+
+
+def create_search_index(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
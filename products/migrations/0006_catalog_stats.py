@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min, Sum
+
+
+def build_catalog_stats(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    CatalogStats = apps.get_model("products", "CatalogStats")
+    using = schema_editor.connection.alias
+    products = Product.objects.using(using)
+    totals = products.aggregate(price_min=Min("price"), price_max=Max("price"), price_sum=Sum("price"))
+    newest = products.order_by("-created_at", "id").first()
+    CatalogStats.objects.using(using).update_or_create(
+        pk=1,
+        defaults={
+            "total": products.count(),
+            "newest_product": newest,
+            "newest_created_at": newest.created_at if newest else None,
+            "price_min": totals["price_min"],
+            "price_max": totals["price_max"],
+            "price_sum": totals["price_sum"] or 0,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_search_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogStats",
+            fields=[
+                ("id", models.PositiveSmallIntegerField(default=1, editable=False, primary_key=True, serialize=False)),
+                ("total", models.PositiveBigIntegerField(default=0)),
+                ("newest_created_at", models.DateTimeField(blank=True, null=True)),
+                ("price_min", models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ("price_max", models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ("price_sum", models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("newest_product", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="+", to="products.product")),
+            ],
+            options={
+                "verbose_name_plural": "catalog stats",
+            },
+        ),
+        migrations.RunPython(build_catalog_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_catalog_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
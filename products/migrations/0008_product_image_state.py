@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_spool",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_state",
+            field=models.CharField(choices=[("ready", "Tayyor"), ("pending", "Yuklanmoqda"), ("failed", "Xatolik")], default="ready", editable=False, max_length=16),
+        ),
+    ]
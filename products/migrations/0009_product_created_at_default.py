@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_product_image_state"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
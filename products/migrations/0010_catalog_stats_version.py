@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_product_created_at_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogstats",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_catalog_stats_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("receive", "Kirim"), ("sell", "Sotuv"), ("adjust", "Tuzatish")], max_length=16)),
+                ("quantity", models.IntegerField()),
+                ("note", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockShard",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("delta", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="stock",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["stock"], name="product_stock_idx"),
+        ),
+        migrations.AddField(
+            model_name="stockmovement",
+            name="product",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="stock_movements", to="products.product"),
+        ),
+        migrations.AddField(
+            model_name="stockshard",
+            name="product",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="stock_shards", to="products.product"),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(fields=["product", "-id"], name="stock_movement_product_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="stockshard",
+            constraint=models.UniqueConstraint(fields=("product", "shard"), name="stock_shard_unique"),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:25
+
+import django.utils.timezone
+import products.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_stock_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                ("name", models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("refcount", models.PositiveIntegerField(default=0)),
+                ("variants", models.JSONField(blank=True, default=dict)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image",
+            field=products.models.ContentAddressedImageField(blank=True, upload_to="products/"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_image_blobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductDeletion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("product_id", models.UUIDField()),
+                ("deleted_at", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ),
+    ]
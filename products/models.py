@@ -1,21 +1,217 @@
+import posixpath
 import uuid
 from datetime import timedelta
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.files import ImageFieldFile
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 
+from .search import normalize_search_text
+
+
+class ContentAddressedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        from . import blobs
+
+        prefix = posixpath.dirname(self.field.generate_filename(self.instance, name))
+        self.name = blobs.store(self.storage, prefix, content, name)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ContentAddressedImageField(models.ImageField):
+    """An ``ImageField`` that saves uploads through ``products.blobs``."""
+
+    attr_class = ContentAddressedImageFieldFile
+
 
 class Product(models.Model):
+    class ImageState(models.TextChoices):
+        READY = "ready", "Tayyor"
+        PENDING = "pending", "Yuklanmoqda"
+        FAILED = "failed", "Xatolik"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
+    search_name = models.CharField(max_length=255, default="", editable=False)
     price = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
-    image = models.ImageField(upload_to="products/", blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    image = ContentAddressedImageField(upload_to="products/", blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_state = models.CharField(
+        max_length=16, choices=ImageState.choices, default=ImageState.READY, editable=False
+    )
+    image_spool = models.CharField(max_length=255, blank=True, editable=False)
+    # Quantity as of the last fold; see products.stock for the on-hand figure.
+    stock = models.IntegerField(default=0, editable=False)
+    # A default rather than auto_now_add so bulk loaders can backdate rows.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination walks these in order; see ProductQueryMixin.sort_orderings.
+            models.Index(fields=["-created_at", "id"], name="product_created_keyset_idx"),
+            models.Index(fields=["-price", "-created_at", "id"], name="product_price_keyset_idx"),
+            models.Index(fields=["stock"], name="product_stock_idx"),
+            # products.typeahead syncs other workers' writes by updated_at.
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+    def _variant_url(self, variant: str, key: str) -> str:
+        name = (self.image_variants.get(variant) or {}).get(key)
+        if name and self.image_variants.get("source") == self.image.name:
+            return self.image.storage.url(name)
+        return self.image.url if self.image else ""
+
+    def _srcset(self, key: str) -> str:
+        if self.image_variants.get("source") != self.image.name:
+            return ""
+        return ", ".join(
+            f"{self.image.storage.url(stored[key])} {stored['width']}w"
+            for variant, stored in self.image_variants.items()
+            if variant != "source"
+        )
+
+    @property
+    def image_pending(self) -> bool:
+        return self.image_state == self.ImageState.PENDING
+
+    @property
+    def has_image_variants(self) -> bool:
+        return bool(self.image) and self.image_variants.get("source") == self.image.name
+
+    @property
+    def thumbnail_url(self) -> str:
+        return self._variant_url("thumb", "fallback")
+
+    @property
+    def card_image_url(self) -> str:
+        return self._variant_url("card", "fallback")
+
+    @property
+    def full_image_url(self) -> str:
+        return self._variant_url("full", "fallback")
+
+    @property
+    def image_srcset(self) -> str:
+        return self._srcset("fallback")
+
+    @property
+    def image_webp_srcset(self) -> str:
+        return self._srcset("webp")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_price = instance.__dict__.get("price")
+        instance._loaded_updated_at = instance.__dict__.get("updated_at")
+        instance._loaded_image = instance.__dict__.get("image")
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search_text(self.name)[:255]
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        if update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            # ``stock`` only moves through products.stock; a full save must
+            # not write back the copy this instance happened to load.
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != "stock"
+            ]
+        # post_save receivers (catalog stats) must commit or roll back with the row.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self._loaded_price = self.price
+        self._loaded_updated_at = self.updated_at
+        self._loaded_image = self.image.name
+
+
+class CatalogStats(models.Model):
+    """Single-row catalog summary maintained by ``products.stats``."""
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1, editable=False)
+    total = models.PositiveBigIntegerField(default=0)
+    newest_product = models.ForeignKey(
+        Product, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    newest_created_at = models.DateTimeField(null=True, blank=True)
+    price_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "catalog stats"
+
+    def __str__(self) -> str:
+        return f"{self.total} product(s)"
+
+
+class ProductDeletion(models.Model):
+    """Ids of recently deleted products, so ``products.typeahead`` can sync deletes without a reload."""
+
+    product_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self) -> str:
+        return str(self.product_id)
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of stock changes; ``quantity`` is signed."""
+
+    class Kind(models.TextChoices):
+        RECEIVE = "receive", "Kirim"
+        SELL = "sell", "Sotuv"
+        ADJUST = "adjust", "Tuzatish"
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements")
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    quantity = models.IntegerField()
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["product", "-id"], name="stock_movement_product_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} {self.quantity:+d} ({self.product_id})"
+
+
+class StockShard(models.Model):
+    """One of ``STOCK_SHARDS`` running totals per product, not yet folded into ``Product.stock``."""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards")
+    shard = models.PositiveSmallIntegerField()
+    delta = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["product", "shard"], name="stock_shard_unique")]
+
+
+class ImageBlob(models.Model):
+    """A stored image file, named by its content hash and shared by every product using it."""
+
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # Products whose ``image`` is this blob; maintained by ``products.blobs``.
+    refcount = models.PositiveIntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self) -> str:
         return self.name
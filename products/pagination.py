@@ -0,0 +1,113 @@
+"""Keyset (cursor) pagination for the product list partials.
+
+``Paginator`` walks the table with ``OFFSET`` and needs a ``COUNT(*)`` to know
+where it is, so the cost of a page grows with its depth. ``KeysetPaginator``
+instead remembers the sort key of the last row it returned and asks for the
+rows strictly after it, which an index on the ordering columns answers in
+constant time no matter how far the user has scrolled.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page: int, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @property
+    def fields(self):
+        return [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    def page(self, cursor: str | None = None) -> KeysetPage:
+        return self._build_page(list(self._page_queryset(cursor)))
+
+    async def apage(self, cursor: str | None = None) -> KeysetPage:
+        return self._build_page([row async for row in self._page_queryset(cursor)])
+
+    def _page_queryset(self, cursor):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+        return queryset[: self.per_page + 1]
+
+    def _build_page(self, rows) -> KeysetPage:
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        return KeysetPage(rows, next_cursor)
+
+    def encode_cursor(self, obj) -> str:
+        values = [_serialize(getattr(obj, name)) for name, _ in self.fields]
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, token: str) -> list:
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, UnicodeError, ValueError) as exc:
+            raise InvalidCursor(token) from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(token)
+        try:
+            return [
+                self._output_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except ValidationError as exc:
+            raise InvalidCursor(token) from exc
+
+    def _output_field(self, name: str):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.queryset.query.annotations[name].output_field
+
+    def _after(self, values) -> Q:
+        # (a, b, c) > (x, y, z) expands to a > x OR (a = x AND b > y) OR ...,
+        # with each comparison flipped for descending columns.
+        condition = Q()
+        for position, (name, descending) in enumerate(self.fields):
+            lookup = "lt" if descending else "gt"
+            branch = Q(**{f"{name}__{lookup}": values[position]})
+            for prefix, (prefix_name, _) in enumerate(self.fields[:position]):
+                branch &= Q(**{prefix_name: values[prefix]})
+            condition |= branch
+        return condition
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
@@ -0,0 +1,286 @@
+"""Per-request timing: database, templates and file storage.
+
+``ProfilingMiddleware`` opens a ``RequestProfile`` for every request and
+records into it:
+
+* each SQL statement, through ``connection.execute_wrapper`` on every
+  configured database;
+* template rendering, by wrapping the Django template backend's ``render``
+  (nested renders such as cached row fragments count once, at the outermost
+  template);
+* calls on the default file storage class (``save``, ``url``, ``open``, ...),
+  which is where time goes when images live on R2.
+
+The totals go out as a ``Server-Timing`` header (to staff users, or to
+everyone with ``DEBUG`` or ``PROFILING_SERVER_TIMING`` on), are folded into a rolling
+window of recent requests per view that ``snapshot()`` summarises for the
+staff-only stats endpoint, and requests slower than
+``PROFILING_SLOW_REQUEST_MS`` are logged with their slowest SQL.
+"""
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.files.storage import storages
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger(__name__)
+
+STORAGE_METHODS = ("save", "open", "delete", "exists", "url", "size")
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+@dataclass
+class RequestProfile:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    query_ms: float = 0.0
+    template_ms: float = 0.0
+    storage_calls: int = 0
+    storage_ms: float = 0.0
+    statements: list = field(default_factory=list)
+    template_depth: int = 0
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_query(self, sql: str, duration_ms: float) -> None:
+        self.queries += 1
+        self.query_ms += duration_ms
+        limit = getattr(settings, "PROFILING_MAX_STATEMENTS", 50)
+        if len(self.statements) < limit:
+            self.statements.append((duration_ms, sql))
+        else:
+            # Keep the slowest statements once the buffer is full.
+            fastest = min(range(limit), key=lambda index: self.statements[index][0], default=None)
+            if fastest is not None and self.statements[fastest][0] < duration_ms:
+                self.statements[fastest] = (duration_ms, sql)
+
+    def server_timing(self, total_ms: float) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.query_ms:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template_ms:.1f}",
+                f'storage;dur={self.storage_ms:.1f};desc="{self.storage_calls} calls"',
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+
+def current_profile() -> RequestProfile | None:
+    return _current.get()
+
+
+def _record_sql(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.template_depth:
+            return render(self, *args, **kwargs)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_depth -= 1
+            profile.template_ms += (time.perf_counter() - started) * 1000
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def _timed_storage_call(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return method(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profile.storage_calls += 1
+            profile.storage_ms += (time.perf_counter() - started) * 1000
+
+    wrapper._profiled = True
+    return wrapper
+
+
+_install_lock = threading.Lock()
+
+
+def install_instrumentation() -> None:
+    """Wrap template rendering and the default storage class; safe to call repeatedly."""
+    with _install_lock:
+        if not getattr(DjangoTemplate.render, "_profiled", False):
+            DjangoTemplate.render = _timed_render(DjangoTemplate.render)
+        storage_class = type(storages["default"])
+        for name in STORAGE_METHODS:
+            method = getattr(storage_class, name, None)
+            if method is not None and not getattr(method, "_profiled", False):
+                setattr(storage_class, name, _timed_storage_call(method))
+
+
+class ViewStats:
+    """The last ``window`` requests of every view, for percentiles and histograms."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, view: str, total_ms: float, profile: RequestProfile) -> None:
+        sample = (total_ms, profile.queries, profile.query_ms, profile.template_ms, profile.storage_ms)
+        with self._lock:
+            samples = self._samples.get(view)
+            if samples is None:
+                samples = self._samples[view] = deque(maxlen=self.window)
+            samples.append(sample)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {view: list(values) for view, values in self._samples.items()}
+        return {view: _summarise(values) for view, values in sorted(samples.items())}
+
+
+def _summarise(samples) -> dict:
+    totals = sorted(sample[0] for sample in samples)
+    count = len(samples)
+
+    def quantile(fraction):
+        return round(totals[min(int(fraction * count), count - 1)], 2)
+
+    buckets = {}
+    for bound in HISTOGRAM_BUCKETS_MS:
+        buckets[f"le_{bound}ms"] = sum(1 for value in totals if value <= bound)
+    buckets["inf"] = count
+    return {
+        "count": count,
+        "p50_ms": quantile(0.50),
+        "p95_ms": quantile(0.95),
+        "p99_ms": quantile(0.99),
+        "max_ms": round(totals[-1], 2),
+        "mean_queries": round(sum(sample[1] for sample in samples) / count, 2),
+        "mean_db_ms": round(sum(sample[2] for sample in samples) / count, 2),
+        "mean_template_ms": round(sum(sample[3] for sample in samples) / count, 2),
+        "mean_storage_ms": round(sum(sample[4] for sample in samples) / count, 2),
+        "histogram": buckets,
+    }
+
+
+view_stats = ViewStats(window=getattr(settings, "PROFILING_WINDOW", 500))
+
+
+def snapshot() -> dict:
+    return view_stats.snapshot()
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_instrumentation()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with self.wrap_connections():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = None if self.server_timing_for_everyone() else getattr(request, "user", None)
+        return self.finish(request, response, profile, user)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with self.wrap_connections():
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = None
+        if not self.server_timing_for_everyone() and hasattr(request, "auser"):
+            user = await request.auser()
+        return self.finish(request, response, profile, user)
+
+    @staticmethod
+    def server_timing_for_everyone() -> bool:
+        return settings.DEBUG or getattr(settings, "PROFILING_SERVER_TIMING", False)
+
+    @staticmethod
+    def wrap_connections() -> ExitStack:
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_record_sql))
+        return stack
+
+    def finish(self, request, response, profile: RequestProfile, user=None):
+        total_ms = profile.elapsed_ms()
+        # The header exposes query counts and timings, so only staff see it in production.
+        if self.server_timing_for_everyone() or getattr(user, "is_staff", False):
+            response["Server-Timing"] = profile.server_timing(total_ms)
+        view = self.view_name(request)
+        view_stats.add(view, total_ms, profile)
+        threshold = getattr(settings, "PROFILING_SLOW_REQUEST_MS", 500)
+        if threshold and total_ms >= threshold:
+            self.log_slow_request(request, view, total_ms, profile)
+        return response
+
+    @staticmethod
+    def view_name(request) -> str:
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name or match._func_path
+
+    def log_slow_request(self, request, view, total_ms, profile) -> None:
+        statements = sorted(profile.statements, key=lambda item: item[0], reverse=True)
+        logger.warning(
+            "Slow request %s %s (%s): %.1f ms, %s queries in %.1f ms, templates %.1f ms, "
+            "storage %s calls in %.1f ms\n%s",
+            request.method,
+            request.path,
+            view,
+            total_ms,
+            profile.queries,
+            profile.query_ms,
+            profile.template_ms,
+            profile.storage_calls,
+            profile.storage_ms,
+            "\n".join(f"  {duration:.1f} ms  {sql}" for duration, sql in statements[:10]),
+        )
@@ -0,0 +1,89 @@
+"""Cache of first-page query results for the product list and table.
+
+The unfiltered first page and a handful of popular searches make up most
+list traffic. Their rows (and, for searches, the match count) are cached
+under a key built from the normalized search, sort and stock filter, the
+page size and the database alias, plus the catalog version
+(``products.stats``) and the stock ledger position (``products.stock``).
+Every product save or delete bumps the version and every stock movement
+moves the ledger, so a write invalidates every cached page at once without
+finding or deleting any key; the stale entries simply stop being asked for
+and age out.
+
+Only first pages are cached: later pages are reached by cursor and are
+rarely requested twice. Which template renders the rows (``view``) is left
+out of the key so table and cards share an entry.
+
+The backing cache is the ``CACHES`` alias named by ``PRODUCT_RESULT_CACHE``
+(set it to ``None`` to disable caching). Entries are pickled, so any backend
+works; ``MAX_ENTRIES`` bounds it, and with the default ``LocMemCache`` the
+least recently used entries are evicted first. Per-process hit and miss
+counts are reported by the ``products-profiling`` view.
+"""
+
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class Counters:
+    def __init__(self):
+        self._counts = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            self._counts["hits" if hit else "misses"] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {"hits": 0, "misses": 0}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else None
+        return counts
+
+
+counters = Counters()
+
+
+def get_result_cache():
+    alias = getattr(settings, "PRODUCT_RESULT_CACHE", "default")
+    return caches[alias] if alias else None
+
+
+def result_key(*parts) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f"product-results:{digest}"
+
+
+def get_or_compute(key: str | None, compute):
+    """The cached value under ``key``, computing and storing it on a miss; ``key=None`` bypasses the cache."""
+    cache = get_result_cache()
+    if cache is None or key is None:
+        return compute()
+    value = cache.get(key)
+    counters.record(value is not None)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+async def aget_or_compute(key: str | None, compute):
+    """``get_or_compute`` with an async ``compute``."""
+    cache = get_result_cache()
+    if cache is None or key is None:
+        return await compute()
+    value = await cache.aget(key)
+    counters.record(value is not None)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value)
+    return value
@@ -0,0 +1,119 @@
+"""Read-replica routing for the catalog's read-heavy views.
+
+``DATABASE_REPLICA_URLS`` adds one ``replicaN`` alias per URL to
+``DATABASES`` and lists them in ``DATABASE_REPLICAS``. The product list, the
+table partial (including infinite scroll) and the export ask
+``read_database(request)`` for an alias and run every query of the response
+on it, the validators included, so an ETag always describes the data it was
+computed from. Replicas are taken round-robin.
+
+Everything else stays on the primary: ``ReplicaRouter`` sends every write
+to ``default`` (even for instances that were loaded from a replica), and
+``PrimaryStickinessMiddleware`` pins a session's reads to the primary for
+``DATABASE_REPLICA_STICKY_SECONDS`` after any unsafe request, so a user
+sees their own writes even while the replicas lag behind.
+
+Without replicas every function here returns ``default``.
+"""
+
+import itertools
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_SESSION_KEY = "_read_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS", "TRACE"}
+
+_round_robin = itertools.count()
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def sticky_seconds() -> float:
+    return getattr(settings, "DATABASE_REPLICA_STICKY_SECONDS", 5)
+
+
+def primary_for(using: str) -> str:
+    """The database that takes writes meant for ``using``."""
+    return DEFAULT_DB_ALIAS if using in replica_aliases() else using
+
+
+def next_replica() -> str:
+    replicas = replica_aliases()
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    return replicas[next(_round_robin) % len(replicas)]
+
+
+def _is_pinned(until) -> bool:
+    return until is not None and until > time.time()
+
+
+def read_database(request) -> str:
+    session = getattr(request, "session", None)
+    if not replica_aliases() or (session is not None and _is_pinned(session.get(STICKY_SESSION_KEY))):
+        return DEFAULT_DB_ALIAS
+    return next_replica()
+
+
+async def aread_database(request) -> str:
+    session = getattr(request, "session", None)
+    if not replica_aliases() or (session is not None and _is_pinned(await session.aget(STICKY_SESSION_KEY))):
+        return DEFAULT_DB_ALIAS
+    return next_replica()
+
+
+class ReplicaRouter:
+    """Keeps writes on the primary; reads go wherever the caller's ``using()`` says."""
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class PrimaryStickinessMiddleware:
+    """Reads from the primary for a while after the session's last write."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.should_pin(request, response):
+            request.session[STICKY_SESSION_KEY] = time.time() + sticky_seconds()
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.should_pin(request, response):
+            await request.session.aset(STICKY_SESSION_KEY, time.time() + sticky_seconds())
+        return response
+
+    @staticmethod
+    def should_pin(request, response) -> bool:
+        return (
+            bool(replica_aliases())
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and hasattr(request, "session")
+        )
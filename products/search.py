@@ -0,0 +1,239 @@
+"""Indexed product name search.
+
+``Product.search_name`` holds a normalized copy of ``name`` that is written
+once in ``Product.save``. Each database vendor indexes that column in its own
+way:
+
+* PostgreSQL: a GIN ``tsvector`` expression index for ranked word-prefix
+  matches and a ``pg_trgm`` GIN index that backs substring matches.
+* SQLite: two FTS5 tables keyed by the product rowid and kept in sync by
+  the same triggers, one tokenized into words for ranked word-prefix matches
+  and one into trigrams for substring matches of three or more characters
+  (shorter queries only match word prefixes). Anything that renumbers
+  rowids (``VACUUM``, a table rebuild) needs ``manage.py
+  rebuild_search_index`` afterwards.
+
+Any other backend falls back to ``LIKE`` on the normalized column.
+"""
+
+import re
+import unicodedata
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# Uzbek Latin spells o‘/g‘ and the tutuq belgisi with whatever apostrophe the
+# keyboard produces. They are dropped entirely so every variant indexes alike.
+APOSTROPHES = "'`´‘’ʻʼʹ′"
+_APOSTROPHE_TABLE = str.maketrans("", "", APOSTROPHES)
+_WHITESPACE_RE = re.compile(r"\s+")
+_TERM_RE = re.compile(r"\w+")
+
+FTS_TABLE = "products_product_fts"
+TRIGRAM_TABLE = "products_product_trigram"
+SQLITE_SEARCH_TABLES = {
+    FTS_TABLE: "unicode61 remove_diacritics 2",
+    TRIGRAM_TABLE: "trigram",
+}
+
+
+def normalize_search_text(value: str) -> str:
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    value = value.translate(_APOSTROPHE_TABLE)
+    return _WHITESPACE_RE.sub(" ", value).strip()
+
+
+def search_terms(query: str) -> list[str]:
+    return _TERM_RE.findall(normalize_search_text(query))
+
+
+def substring_pattern(query: str) -> str:
+    """A ``LIKE ... ESCAPE '\\'`` pattern matching the normalized query anywhere."""
+    escaped = normalize_search_text(query).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SearchBackend:
+    """Filters and ranks a ``Product`` queryset for a free-text query."""
+
+    def __init__(self, table: str):
+        self.table = table
+
+    def filter(self, queryset, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        condition = Q()
+        for term in terms:
+            condition &= Q(search_name__contains=term)
+        return queryset.filter(condition)
+
+    def annotate_rank(self, queryset, query: str):
+        return queryset.annotate(search_rank=RawSQL("0", [], output_field=FloatField()))
+
+
+class PostgresSearchBackend(SearchBackend):
+    def _tsquery(self, terms) -> str:
+        return " & ".join(f"{term}:*" for term in terms)
+
+    def filter(self, queryset, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        column = f'"{self.table}"."search_name"'
+        matches = RawSQL(
+            f"(to_tsvector('simple', {column}) @@ to_tsquery('simple', %s)"
+            f" OR {column} LIKE %s ESCAPE '\\')",
+            [self._tsquery(terms), substring_pattern(query)],
+            output_field=BooleanField(),
+        )
+        return queryset.filter(matches)
+
+    def annotate_rank(self, queryset, query: str):
+        terms = search_terms(query)
+        column = f'"{self.table}"."search_name"'
+        rank = RawSQL(
+            f"ts_rank(to_tsvector('simple', {column}), to_tsquery('simple', %s))"
+            f" + similarity({column}, %s)",
+            [self._tsquery(terms), normalize_search_text(query)],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def _match(self, terms) -> str:
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def _substring(self, query: str) -> str | None:
+        # The trigram index cannot look up fewer than three characters.
+        text = normalize_search_text(query)
+        if len(text) < 3:
+            return None
+        return '"{}"'.format(text.replace('"', '""'))
+
+    def filter(self, queryset, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        # Word prefixes from the unicode61 index, plus the same mid-word substring match as PostgreSQL.
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = [self._match(terms)]
+        substring = self._substring(query)
+        if substring is not None:
+            sql += f" UNION SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH %s"
+            params.append(substring)
+        matches = RawSQL(f'"{self.table}".rowid IN ({sql})', params, output_field=BooleanField())
+        return queryset.filter(matches)
+
+    def annotate_rank(self, queryset, query: str):
+        # bm25() is lower-is-better; negate it so every backend sorts "-search_rank".
+        # Substring-only matches have no word match and rank 0, below every word match.
+        rank = RawSQL(
+            f"COALESCE((SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE}"
+            f' WHERE {FTS_TABLE} MATCH %s AND rowid = "{self.table}".rowid), 0)',
+            [self._match(search_terms(query))],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank)
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(model, using: str = "default") -> SearchBackend:
+    vendor = connections[using].vendor
+    return BACKENDS.get(vendor, SearchBackend)(model._meta.db_table)
+
+
+def install_search_index(schema_editor, table: str = "products_product") -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS product_search_tsv_idx ON {table} "
+            "USING gin (to_tsvector('simple', search_name))"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS product_search_trgm_idx ON {table} "
+            "USING gin (search_name gin_trgm_ops)"
+        )
+    elif vendor == "sqlite":
+        ensure_sqlite_search_index(schema_editor.connection, table)
+
+
+def uninstall_search_index(schema_editor, table: str = "products_product") -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_tsv_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_trgm_idx")
+    elif vendor == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        for fts_table in SQLITE_SEARCH_TABLES:
+            schema_editor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+def ensure_sqlite_search_index(connection, table: str = "products_product", force: bool = False):
+    """Create the FTS5 tables and their triggers, rebuilding them if they were lost.
+
+    SQLite migrations that alter ``products_product`` recreate the table, which
+    drops its triggers and renumbers its rows, so this also runs after every
+    ``migrate``.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f"{FTS_TABLE}_a_"],
+        )
+        triggers = cursor.fetchone()[0]
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = %s", [TRIGRAM_TABLE])
+        if triggers == 3 and cursor.fetchone()[0] and not force:
+            return
+        # Older databases have triggers that only feed the word index; recreate them for both.
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        inserts, deletes = "", ""
+        for fts_table, tokenizer in SQLITE_SEARCH_TABLES.items():
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                f"search_name, content = '{table}', content_rowid = 'rowid', "
+                f"tokenize = '{tokenizer}')"
+            )
+            inserts += f"INSERT INTO {fts_table} (rowid, search_name) VALUES (new.rowid, new.search_name); "
+            deletes += (
+                f"INSERT INTO {fts_table} ({fts_table}, rowid, search_name) "
+                "VALUES ('delete', old.rowid, old.search_name); "
+            )
+        cursor.execute(f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN {inserts}END")
+        cursor.execute(f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN {deletes}END")
+        cursor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_name ON {table} "
+            f"BEGIN {deletes}{inserts}END"
+        )
+        for fts_table in SQLITE_SEARCH_TABLES:
+            cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+@contextmanager
+def deferred_search_index(connection, table: str = "products_product"):
+    """Suspend per-row FTS maintenance during a bulk load and rebuild once after.
+
+    Rebuilding the FTS5 indexes in one pass is much cheaper than firing the
+    insert trigger for every row. Other vendors keep their indexes live.
+    """
+    if connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+    try:
+        yield
+    finally:
+        ensure_sqlite_search_index(connection, table, force=True)
@@ -0,0 +1,211 @@
+"""Synthetic catalog generation for load tests and benchmarks.
+
+``generate_products`` lazily yields unsaved ``Product`` instances from a
+seeded RNG, so the same ``seed`` always produces the same catalog, and
+``bulk_seed`` writes them with ``bulk_create`` in fixed-size batches, one
+transaction per batch. Nothing is held in memory beyond the current batch.
+
+``bulk_create`` skips ``Product.save`` and model signals, so the generator
+fills in ``search_name`` itself, and ``bulk_seed`` counts the placeholder
+image references per batch and rebuilds the catalog stats once at the end. Rows are generated oldest first with time-ordered UUIDs so
+both the primary key and the ``created_at`` index are appended to in order.
+"""
+
+import io
+import itertools
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+from PIL import Image
+
+from . import blobs, stats
+from .models import ImageBlob, Product
+from .search import deferred_search_index, normalize_search_text
+
+PRODUCT_CATALOG = [
+    "Sea Salt Caramels",
+    "Dark Chocolate Hazelnuts",
+    "Milk Chocolate Truffles",
+    "Peanut Butter Bites",
+    "Sour Raspberry Gummies",
+    "Rainbow Lollipops",
+    "Mini Marshmallow Packs",
+    "Vanilla Fudge Squares",
+    "Almond Toffee Crunch",
+    "Gummy Bear Mix",
+    "Assorted Macarons",
+    "Chocolate Covered Espresso Beans",
+    "Fruit Leather Strips",
+    "Honey Roasted Cashews",
+    "Maple Pecan Brittle",
+    "Caramel Popcorn Bags",
+    "Peppermint Bark",
+    "Strawberry Cream Taffy",
+    "Chocolate Chip Cookies",
+    "Cocoa Powder Tin",
+    "Baking Soda Canister",
+    "Sea Salt Grinder",
+    "Herb Scissors",
+    "Stainless Mixing Bowls",
+    "Silicone Spatula Set",
+    "Cast Iron Skillet",
+    "Reusable Piping Bags",
+    "Decorative Sprinkles Mix",
+    "Vanilla Bean Paste",
+    "Organic Cane Sugar",
+    "Brownie Mix Pouches",
+    "Mini Rolling Pins",
+    "Kitchen Shears",
+    "Rechargeable Batteries AA (8 pack)",
+    "Rechargeable Batteries AAA (8 pack)",
+    "Colorful Measuring Spoons",
+    "Mini Storage Jars",
+    "Ceramic Dessert Plates",
+    "Reusable Bento Boxes",
+    "Lunch Bag Coolers",
+    "Kid-Friendly Water Bottles",
+    "Silicone Ice Pop Molds",
+    "Chocolate Drizzle Sauce",
+    "Butterscotch Syrup",
+    "Whipped Cream Chargers",
+    "Decorative Gift Tins",
+    "Party Favor Bags",
+    "Confetti Cupcake Kits",
+    "Chocolate Fountain Refills",
+]
+
+PACK_SIZES = ["100g", "250g", "500g", "1kg", "6 pack", "12 pack", "Gift Box", "Family Size"]
+PLACEHOLDER_COLORS = ["#5c7cfa", "#f87171", "#34d399", "#fbbf24", "#a78bfa", "#38bdf8", "#f472b6", "#94a3b8"]
+
+
+@dataclass
+class SeedResult:
+    created: int
+    elapsed: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.created / self.elapsed if self.elapsed else float(self.created)
+
+
+def create_placeholder_images(storage=None, using: str = "default") -> list[tuple[str, dict]]:
+    """Store one small placeholder per color and return ``(name, variants)`` pairs.
+
+    Placeholders are ``products.blobs`` blobs, so reseeding reuses them and
+    ``bulk_seed`` counts a reference for every row that gets one.
+    """
+    storage = storage or default_storage
+    placeholders = []
+    for index, color in enumerate(PLACEHOLDER_COLORS):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 640), color=color).save(buffer, format="JPEG", quality=70)
+        name = blobs.store(storage, "products", ContentFile(buffer.getvalue()), f"seed-placeholder-{index}.jpg", using)
+        stored = Product(image=name).image
+        placeholders.append((name, blobs.get_variants(stored, using=using)))
+    return placeholders
+
+
+def _count_image_references(batch, using: str) -> None:
+    counts = Counter(product.image.name for product in batch if product.image)
+    if counts:
+        ImageBlob.objects.using(using).filter(name__in=counts).update(
+            refcount=F("refcount") + Case(*(When(name=name, then=count) for name, count in counts.items()))
+        )
+
+
+def _time_ordered_uuid(moment, rng) -> uuid.UUID:
+    # UUIDv7 layout: 48-bit millisecond timestamp, then random bits. Rows are
+    # generated oldest first, so primary keys arrive in index order.
+    millis = int(moment.timestamp() * 1000)
+    value = (millis << 80) | rng.getrandbits(80)
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+def generate_products(count: int, seed: int = 0, days: int = 365, now=None, placeholders=None):
+    rng = random.Random(seed)
+    now = now or timezone.now()
+    window = timedelta(days=days).total_seconds()
+    for index in range(count):
+        base = PRODUCT_CATALOG[index % len(PRODUCT_CATALOG)]
+        name = f"{base} {rng.choice(PACK_SIZES)} #{index + 1}"
+        # Ages shrink as index grows (oldest first) and are squared so that,
+        # as in a live catalog, recent days hold more products than old ones.
+        position = (count - index - rng.random()) / count
+        created_at = now - timedelta(seconds=window * position**2)
+        product = Product(
+            id=_time_ordered_uuid(created_at, rng),
+            name=name,
+            search_name=normalize_search_text(name)[:255],
+            price=Decimal(rng.randint(250, 12000_00)) / 100,
+            created_at=created_at,
+        )
+        if placeholders:
+            product.image, product.image_variants = rng.choice(placeholders)
+        yield product
+
+
+def _batches(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def _relaxed_durability(connection):
+    """Skip fsync and use a large page cache on SQLite while a throwaway load runs."""
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        synchronous = cursor.fetchone()[0]
+        cursor.execute("PRAGMA cache_size")
+        cache_size = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA cache_size = -262144")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA synchronous = {int(synchronous)}")
+            cursor.execute(f"PRAGMA cache_size = {int(cache_size)}")
+
+
+def bulk_seed(
+    count: int,
+    batch_size: int = 5000,
+    seed: int = 0,
+    days: int = 365,
+    with_images: bool = False,
+    using: str = "default",
+    progress=None,
+) -> SeedResult:
+    placeholders = create_placeholder_images(using=using) if with_images else None
+    started = time.perf_counter()
+    created = 0
+    manager = Product.objects.using(using)
+    products = generate_products(count, seed, days, placeholders=placeholders)
+    connection = connections[using]
+    with _relaxed_durability(connection), deferred_search_index(connection):
+        for batch in _batches(products, batch_size):
+            with transaction.atomic(using=using):
+                manager.bulk_create(batch, batch_size=batch_size)
+                _count_image_references(batch, using)
+            created += len(batch)
+            if progress:
+                progress(created, time.perf_counter() - started)
+    stats.rebuild(using=using)
+    return SeedResult(created=created, elapsed=time.perf_counter() - started)
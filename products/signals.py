@@ -0,0 +1,135 @@
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import blobs, events, stats, stock, typeahead
+from .fragments import invalidate_product_fragments
+from .models import Product
+
+_MISSING = object()
+_suppressed = contextvars.ContextVar("product_signals_suppressed", default=False)
+
+
+@contextmanager
+def suppress_product_signals():
+    """Skip the receivers below; the caller does their work once for a whole batch."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def _unless_suppressed(handler):
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not _suppressed.get():
+            handler(*args, **kwargs)
+
+    return wrapper
+
+
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def update_stats_on_save(sender, instance, created, raw=False, using="default", update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.record_created(instance, using=using)
+        return
+    if update_fields is not None and "price" not in update_fields:
+        stats.bump_version(using=using)
+        return
+    previous = getattr(instance, "_loaded_price", _MISSING)
+    if previous is _MISSING:
+        # Saved without being loaded first, so the old price is unknown.
+        stats.rebuild(using=using)
+    else:
+        stats.record_price_change(instance, previous, using=using)
+
+
+@receiver(post_delete, sender=Product)
+@_unless_suppressed
+def update_stats_on_delete(sender, instance, using="default", **kwargs):
+    stats.record_deleted(instance, using=using)
+
+
+# Registered after the stats receivers so the catalog version is already bumped.
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def update_typeahead_on_save(sender, instance, raw=False, using="default", **kwargs):
+    if not raw:
+        typeahead.record_write(instance.pk, instance.name, using=using)
+
+
+@receiver(post_delete, sender=Product)
+@_unless_suppressed
+def update_typeahead_on_delete(sender, instance, using="default", **kwargs):
+    typeahead.record_write(instance.pk, None, using=using)
+
+
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def publish_event_on_save(sender, instance, created, raw=False, using="default", **kwargs):
+    if not raw:
+        events.publish(events.CREATED if created else events.UPDATED, instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Product)
+@_unless_suppressed
+def publish_event_on_delete(sender, instance, using="default", **kwargs):
+    events.publish(events.DELETED, instance.pk, using=using)
+
+
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def invalidate_fragments_on_save(sender, instance, created, raw=False, using="default", **kwargs):
+    previous = getattr(instance, "_loaded_updated_at", None)
+    if not created and previous is not None:
+        on_hand = stock.on_hand(instance.pk, using=using)
+        invalidate_product_fragments(instance, updated_at=previous, on_hand=on_hand)
+
+
+# Before the delete, while the stock shards that key the fragments still exist.
+@receiver(pre_delete, sender=Product)
+@_unless_suppressed
+def invalidate_fragments_on_delete(sender, instance, using="default", **kwargs):
+    invalidate_product_fragments(instance, on_hand=stock.on_hand(instance.pk, using=using))
+
+
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def count_image_references_on_save(sender, instance, raw=False, using="default", update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    # Unknown when the instance was not loaded first; the old blob then keeps its reference.
+    previous = getattr(instance, "_loaded_image", None) or ""
+    current = instance.image.name or ""
+    if previous != current:
+        blobs.acquire(current, using=using)
+        blobs.release(instance.image.storage, [(previous, None)], using=using)
+
+
+@receiver(post_save, sender=Product)
+@_unless_suppressed
+def build_variants_on_save(sender, instance, raw=False, using="default", **kwargs):
+    if raw or instance.has_image_variants or not (instance.image or instance.image_variants):
+        return
+    previous = instance.image_variants
+    variants = blobs.get_variants(instance.image, using=using) if instance.image else {}
+    Product.objects.using(using).filter(pk=instance.pk).update(image_variants=variants)
+    instance.image_variants = variants
+    source = previous.get("source", "")
+    if previous and not blobs.is_blob_name(source):
+        # A blob's variants are shared and go when the blob does.
+        blobs.release(instance.image.storage, [(source, previous)], using=using)
+
+
+@receiver(post_delete, sender=Product)
+@_unless_suppressed
+def release_image_on_delete(sender, instance, using="default", **kwargs):
+    if instance.image or instance.image_variants:
+        blobs.release(instance.image.storage, [(instance.image.name or "", instance.image_variants)], using=using)
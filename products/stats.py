@@ -0,0 +1,253 @@
+"""Incrementally maintained catalog statistics.
+
+``CatalogStats`` is a single row holding the totals the product list shows.
+Every ``Product`` save and delete adjusts it with one ``UPDATE`` built from
+``F()`` expressions, inside the same transaction as the product write, so
+reading the stats costs a primary-key lookup instead of scanning the table.
+Only removing the current minimum, maximum or newest product falls back to
+an aggregate, which the price and ``created_at`` indexes answer directly.
+
+Bulk writers that bypass model signals call ``record_deleted_many`` or
+``record_price_changes`` with the rows they touched (``products.bulk``), or
+``rebuild()`` once they are done when they cannot tell (``bulk_create`` of a
+whole catalog, imports).
+
+``version`` goes up by exactly one for every product save or delete
+(including saves that leave the totals alone) and for every ``rebuild()``, so
+``get_version()`` is a cheap validator for anything rendered from the
+catalog, and a process that saw version ``n`` and then its own write knows
+it missed nothing if the version is now ``n + 1``.
+"""
+
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Case, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from . import routing
+from .models import CatalogStats, Product
+
+STATS_PK = 1
+
+
+def get_stats(using: str = "default") -> CatalogStats:
+    stats = (
+        CatalogStats.objects.using(using)
+        .select_related("newest_product")
+        .filter(pk=STATS_PK)
+        .first()
+    )
+    if stats is None:
+        stats = rebuild(using=using)
+    return stats
+
+
+async def aget_stats(using: str = "default") -> CatalogStats:
+    stats = (
+        await CatalogStats.objects.using(using)
+        .select_related("newest_product")
+        .filter(pk=STATS_PK)
+        .afirst()
+    )
+    if stats is None:
+        stats = await sync_to_async(rebuild)(using=using)
+    return stats
+
+
+def get_version(using: str = "default") -> int:
+    version = CatalogStats.objects.using(using).filter(pk=STATS_PK).values_list("version", flat=True).first()
+    if version is None:
+        version = rebuild(using=using).version
+    return version
+
+
+async def aget_version(using: str = "default") -> int:
+    version = await CatalogStats.objects.using(using).filter(pk=STATS_PK).values_list("version", flat=True).afirst()
+    if version is None:
+        version = (await sync_to_async(rebuild)(using=using)).version
+    return version
+
+
+def get_validator(using: str = "default") -> tuple:
+    """``(version, newest product id)`` for keying anything cached outside the database.
+
+    The version alone starts over when the catalog does (a flushed or
+    restored database, every test case); paired with the newest product's id
+    it does not repeat in practice.
+    """
+    state = CatalogStats.objects.using(using).filter(pk=STATS_PK).values_list("version", "newest_product_id").first()
+    if state is None:
+        stats = rebuild(using=using)
+        state = (stats.version, stats.newest_product_id)
+    return (state[0], str(state[1]))
+
+
+async def aget_validator(using: str = "default") -> tuple:
+    state = (
+        await CatalogStats.objects.using(using)
+        .filter(pk=STATS_PK)
+        .values_list("version", "newest_product_id")
+        .afirst()
+    )
+    if state is None:
+        stats = await sync_to_async(rebuild)(using=using)
+        state = (stats.version, stats.newest_product_id)
+    return (state[0], str(state[1]))
+
+
+def rebuild(using: str = "default") -> CatalogStats:
+    # Replicas are read-only; the rebuilt row reaches them through replication.
+    using = routing.primary_for(using)
+    products = Product.objects.using(using)
+    with transaction.atomic(using=using):
+        current = CatalogStats.objects.using(using).filter(pk=STATS_PK).values_list("version", flat=True).first()
+        totals = products.aggregate(
+            price_min=Min("price"),
+            price_max=Max("price"),
+            price_sum=Sum("price"),
+        )
+        newest = products.order_by("-created_at", "id").first()
+        stats, _ = CatalogStats.objects.using(using).update_or_create(
+            pk=STATS_PK,
+            defaults={
+                "total": products.count(),
+                "newest_product": newest,
+                "newest_created_at": newest.created_at if newest else None,
+                "price_min": totals["price_min"],
+                "price_max": totals["price_max"],
+                "price_sum": totals["price_sum"] or Decimal("0"),
+                "version": (current or 0) + 1,
+            },
+        )
+    return stats
+
+
+def _update(using: str, **changes) -> None:
+    changes.setdefault("version", F("version") + 1)
+    updated = CatalogStats.objects.using(using).filter(pk=STATS_PK).update(**changes)
+    if not updated:
+        # First write against an empty stats table: derive everything instead.
+        rebuild(using=using)
+
+
+def bump_version(using: str = "default") -> None:
+    _update(using)
+
+
+def record_created(product: Product, using: str = "default") -> None:
+    price = Value(product.price)
+    _update(
+        using,
+        total=F("total") + 1,
+        price_sum=F("price_sum") + price,
+        price_min=Least(Coalesce("price_min", price), price),
+        price_max=Greatest(Coalesce("price_max", price), price),
+        newest_product=Case(
+            When(
+                Q(newest_created_at__isnull=True) | Q(newest_created_at__lt=product.created_at),
+                then=Value(product.pk),
+            ),
+            default=F("newest_product"),
+        ),
+        newest_created_at=Greatest(
+            Coalesce("newest_created_at", Value(product.created_at)),
+            Value(product.created_at),
+        ),
+    )
+
+
+def record_price_change(product: Product, previous: Decimal, using: str = "default") -> None:
+    if previous is None or previous == product.price:
+        bump_version(using)
+        return
+    price = Value(product.price)
+    stats = CatalogStats.objects.using(using).filter(pk=STATS_PK).first()
+    if stats is None:
+        rebuild(using=using)
+        return
+    if previous in (stats.price_min, stats.price_max):
+        # The old price may have been the only one at the edge; let the index decide.
+        _update(using, price_sum=F("price_sum") + (product.price - previous))
+        _refresh_price_bounds(using)
+        return
+    _update(
+        using,
+        price_sum=F("price_sum") + (product.price - previous),
+        price_min=Least("price_min", price),
+        price_max=Greatest("price_max", price),
+    )
+
+
+def record_deleted(product: Product, using: str = "default") -> None:
+    stats = CatalogStats.objects.using(using).filter(pk=STATS_PK).first()
+    if stats is None:
+        rebuild(using=using)
+        return
+    _update(using, total=Greatest(F("total") - 1, 0), price_sum=F("price_sum") - product.price)
+    if product.price in (stats.price_min, stats.price_max):
+        _refresh_price_bounds(using)
+    if stats.newest_product_id in (None, product.pk):
+        _refresh_newest(using)
+
+
+def record_deleted_many(products, using: str = "default") -> None:
+    """Like ``record_deleted`` for ``(pk, price)`` pairs already deleted in one statement."""
+    products = list(products)
+    stats = CatalogStats.objects.using(using).filter(pk=STATS_PK).first()
+    if stats is None:
+        rebuild(using=using)
+        return
+    pks = {pk for pk, _ in products}
+    prices = [price for _, price in products]
+    _update(
+        using,
+        total=Greatest(F("total") - len(products), 0),
+        price_sum=F("price_sum") - sum(prices, Decimal("0")),
+    )
+    if stats.price_min in prices or stats.price_max in prices:
+        _refresh_price_bounds(using)
+    # Deleting the newest product already nulled the reference (on_delete=SET_NULL).
+    if stats.newest_product_id is None or stats.newest_product_id in pks:
+        _refresh_newest(using)
+
+
+def record_price_changes(changes, using: str = "default") -> None:
+    """Like ``record_price_change`` for ``(previous, new)`` price pairs written in one statement."""
+    changes = [(previous, new) for previous, new in changes if previous != new]
+    if not changes:
+        bump_version(using)
+        return
+    stats = CatalogStats.objects.using(using).filter(pk=STATS_PK).first()
+    if stats is None:
+        rebuild(using=using)
+        return
+    delta = sum((new - previous for previous, new in changes), Decimal("0"))
+    if any(previous in (stats.price_min, stats.price_max) for previous, _ in changes):
+        _update(using, price_sum=F("price_sum") + delta)
+        _refresh_price_bounds(using)
+        return
+    new_prices = [new for _, new in changes]
+    _update(
+        using,
+        price_sum=F("price_sum") + delta,
+        price_min=Least("price_min", Value(min(new_prices))),
+        price_max=Greatest("price_max", Value(max(new_prices))),
+    )
+
+
+def _refresh_price_bounds(using: str) -> None:
+    bounds = Product.objects.using(using).aggregate(price_min=Min("price"), price_max=Max("price"))
+    # Follow-up to an update that already bumped the version.
+    _update(using, version=F("version"), **bounds)
+
+
+def _refresh_newest(using: str) -> None:
+    newest = Product.objects.using(using).order_by("-created_at", "id").first()
+    _update(
+        using,
+        version=F("version"),
+        newest_product=newest,
+        newest_created_at=newest.created_at if newest else None,
+    )
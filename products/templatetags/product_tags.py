@@ -1,26 +1,28 @@
 from django import template
-from django.contrib.humanize.templatetags.humanize import intcomma
 
-from django.utils import timezone
+from products.formatting import DateLabels, format_price
+from products.fragments import render_product_fragments
+from products.stock import low_stock_threshold
 
 register = template.Library()
 
+
+@register.simple_tag
+def product_fragments(products, template_name, currency):
+    """Render ``template_name`` once per product, reusing cached fragments."""
+    return render_product_fragments(products, template_name, currency)
+
+
 @register.filter
 def price_format(value):
-    if value is None:
-        return ""
-    # Format with commas, then replace comma with a non-breaking space
-    formatted_value = intcomma(int(value))
-    return formatted_value.replace(",", " ") # Using non-breaking space
+    return format_price(value)
+
 
 @register.filter
 def added_label(created_at):
-    if not created_at:
-        return ""
-    created = timezone.localtime(created_at)
-    today = timezone.localtime(timezone.now())
-    if created.date() == today.date():
-        return "Bugun"
-    if created.date() == (today - timezone.timedelta(days=1)).date():
-        return "Kecha"
-    return created.strftime("%d.%m.%Y")
+    return DateLabels()(created_at)
+
+
+@register.filter
+def is_low_stock(on_hand):
+    return on_hand is not None and on_hand <= low_stock_threshold()
@@ -1,17 +1,51 @@
+import asyncio
+import gzip
 import io
+import json
+import os
+import re
 import shutil
 import tempfile
+import threading
+import time
+from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import Product
+from . import blobs, bulk, events, profiling, results, routing, stats, stock, typeahead, uploads
+from .admin import EstimatedCountPaginator, ProductAdmin, estimated_count
+from .benchmark import benchmark_catalog, benchmark_row_rendering, percentile
+from .formatting import DateLabels, format_price, format_prices
+from .fragments import FRAGMENT_TEMPLATES, fragment_key, get_fragment_cache, render_uncached
+from .models import CatalogStats, ImageBlob, Product, StockMovement, StockShard
+from .search import get_search_backend
+from .seeding import bulk_seed, generate_products
+from .upload_handlers import sniff_format
+from .uploads import upload_spooled_image
+from .views import (
+    AsyncProductListView,
+    AsyncProductTablePartialView,
+    ProductEventStreamView,
+    ProductListView,
+    ProductTablePartialView,
+)
 
 
 class ProductAPITestCase(APITestCase):
@@ -139,3 +173,1623 @@ class ProductHTMLViewsTests(TestCase):
         )
         self.assertEqual(response.status_code, 204)
         self.assertIn("HX-Trigger", response.headers)
+
+
+class ProductKeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="scroller",
+            password="strong-password",
+        )
+        self.client.force_login(self.user)
+        for index in range(40):
+            Product.objects.create(name=f"Item {index}", price=Decimal(index % 4))
+
+    def _walk(self, sort):
+        seen = []
+        params = {"sort": sort}
+        while True:
+            response = self.client.get(reverse("products-web-table"), params)
+            self.assertEqual(response.status_code, 200)
+            page_obj = response.context["page_obj"]
+            seen.extend(product.pk for product in page_obj.object_list)
+            if not page_obj.has_next():
+                self.assertIn("stopInfiniteScroll", response.headers["HX-Trigger"])
+                return seen
+            params = {"sort": sort, "cursor": page_obj.next_cursor}
+
+    def test_cursor_walk_visits_every_row_once(self):
+        for sort in ("created", "price"):
+            with self.subTest(sort=sort):
+                seen = self._walk(sort)
+                self.assertEqual(len(seen), 40)
+                self.assertEqual(len(set(seen)), 40)
+
+    def test_price_walk_matches_sort_order(self):
+        expected = list(
+            Product.objects.order_by("-price", "-created_at", "id").values_list("pk", flat=True)
+        )
+        self.assertEqual(self._walk("price"), expected)
+
+    def test_deep_page_does_not_count(self):
+        response = self.client.get(reverse("products-web-table"), {"sort": "created"})
+        cursor = response.context["page_obj"].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("products-web-table"), {"cursor": cursor})
+        self.assertTemplateUsed(response, "products/_product_rows.html")
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries.captured_queries))
+        self.assertNotIn("OFFSET", queries.captured_queries[-1]["sql"])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("products-web-table"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="searcher",
+            password="strong-password",
+        )
+        self.client.force_login(self.user)
+        self.juice = Product.objects.create(name="O‘zbek olma sharbati", price=Decimal("9000"))
+        self.apple = Product.objects.create(name="Olma", price=Decimal("4000"))
+        Product.objects.create(name="Gilos murabbo", price=Decimal("15000"))
+
+    def _names(self, **params):
+        response = self.client.get(reverse("products-web-table"), params)
+        return [product.name for product in response.context["products"]]
+
+    def test_search_name_is_normalized_on_save(self):
+        self.assertEqual(self.juice.search_name, "ozbek olma sharbati")
+        self.juice.name = "G‘ISHT"
+        self.juice.save(update_fields=["name"])
+        self.juice.refresh_from_db()
+        self.assertEqual(self.juice.search_name, "gisht")
+
+    def test_apostrophe_variants_match(self):
+        for query in ("o'zbek", "oʻzbek", "o’zbek", "OZBEK"):
+            with self.subTest(query=query):
+                self.assertEqual(self._names(q=query), [self.juice.name])
+
+    def test_prefix_terms_are_combined(self):
+        self.assertEqual(self._names(q="olm shar"), [self.juice.name])
+        self.assertCountEqual(self._names(q="olm"), [self.juice.name, self.apple.name])
+
+    def test_mid_word_substring_matches(self):
+        self.assertEqual(self._names(q="harbat"), [self.juice.name])
+        self.assertEqual(self._names(q="urab"), ["Gilos murabbo"])
+
+    def test_wildcard_characters_in_the_query_are_literal(self):
+        Product.objects.create(name="Chegirma 100%", price=Decimal("1"))
+        Product.objects.create(name="snake_case", price=Decimal("1"))
+        self.assertEqual(self._names(q="00%"), ["Chegirma 100%"])
+        self.assertEqual(self._names(q="1%0"), [])
+        self.assertEqual(self._names(q="l_a"), [])
+
+    def test_sqlite_substring_search_uses_the_trigram_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite FTS5 only")
+        queryset = get_search_backend(Product).filter(Product.objects.all(), "harbat")
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " | ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("products_product_trigram VIRTUAL TABLE", plan)
+        self.assertNotRegex(plan, r"SCAN products_product(?!_)")
+        self.assertEqual(list(queryset), [self.juice])
+
+    def test_relevance_sort_ranks_closer_matches_first(self):
+        names = self._names(q="olma", sort="relevance")
+        self.assertEqual(names, [self.apple.name, self.juice.name])
+
+    def test_relevance_without_query_falls_back_to_created(self):
+        response = self.client.get(reverse("products-web-table"), {"sort": "relevance"})
+        self.assertEqual(response.context["sort"], "created")
+
+
+class CatalogStatsTests(TestCase):
+    def assertStatsConsistent(self):
+        incremental = stats.get_stats()
+        rebuilt = stats.rebuild()
+        for field in ("total", "newest_product_id", "price_min", "price_max", "price_sum"):
+            self.assertEqual(getattr(incremental, field), getattr(rebuilt, field), field)
+        return rebuilt
+
+    def test_create_update_delete_keep_stats_in_sync(self):
+        cheap = Product.objects.create(name="Cheap", price=Decimal("1.50"))
+        pricey = Product.objects.create(name="Pricey", price=Decimal("99.00"))
+        middle = Product.objects.create(name="Middle", price=Decimal("10.00"))
+        summary = self.assertStatsConsistent()
+        self.assertEqual(summary.total, 3)
+        self.assertEqual(summary.newest_product, middle)
+
+        pricey = Product.objects.get(pk=pricey.pk)
+        pricey.price = Decimal("20.00")
+        pricey.save()
+        summary = self.assertStatsConsistent()
+        self.assertEqual(summary.price_max, Decimal("20.00"))
+
+        middle.delete()
+        cheap.delete()
+        summary = self.assertStatsConsistent()
+        self.assertEqual(summary.total, 1)
+        self.assertEqual(summary.newest_product, pricey)
+        self.assertEqual(summary.price_min, Decimal("20.00"))
+
+        pricey.delete()
+        summary = self.assertStatsConsistent()
+        self.assertEqual(summary.total, 0)
+        self.assertIsNone(summary.newest_product)
+
+    def test_missing_row_is_rebuilt_on_read(self):
+        Product.objects.create(name="Orphan", price=Decimal("3.00"))
+        CatalogStats.objects.all().delete()
+        self.assertEqual(stats.get_stats().total, 1)
+
+    def test_unfiltered_list_reads_stats_without_counting(self):
+        user = get_user_model().objects.create_user(username="stats", password="strong-password")
+        self.client.force_login(user)
+        Product.objects.create(name="Counted", price=Decimal("3.00"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("products-web-list"))
+        self.assertEqual(response.context["stats"]["total"], 1)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries.captured_queries))
+
+    def test_filtered_list_counts_matches(self):
+        user = get_user_model().objects.create_user(username="stats", password="strong-password")
+        self.client.force_login(user)
+        Product.objects.create(name="Olma", price=Decimal("3.00"))
+        Product.objects.create(name="Nok", price=Decimal("4.00"))
+        response = self.client.get(reverse("products-web-list"), {"q": "olma"})
+        self.assertEqual(response.context["stats"]["total"], 1)
+
+
+class ProductFragmentCacheTests(TestCase):
+    def setUp(self):
+        get_fragment_cache().clear()
+        self.addCleanup(get_fragment_cache().clear)
+        self.user = get_user_model().objects.create_user(
+            username="fragments",
+            password="strong-password",
+        )
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="Cached", price=Decimal("1200"))
+
+    def listed_product(self):
+        # The list renders products annotated with their on-hand stock, which is part of the key.
+        return stock.with_on_hand(Product.objects.all()).get(pk=self.product.pk)
+
+    def test_second_render_reuses_cached_row(self):
+        self.client.get(reverse("products-web-table"))
+        key = fragment_key(self.listed_product(), "products/_row.html", "UZS")
+        self.assertIn("Cached", get_fragment_cache().get(key))
+
+        with self.assertTemplateNotUsed("products/_row.html"):
+            response = self.client.get(reverse("products-web-table"))
+        self.assertContains(response, "Cached")
+
+    def test_save_invalidates_and_rerenders(self):
+        self.client.get(reverse("products-web-table"))
+        old_key = fragment_key(self.listed_product(), "products/_row.html", "UZS")
+        self.assertIsNotNone(get_fragment_cache().get(old_key))
+        product = Product.objects.get(pk=self.product.pk)
+        product.name = "Renamed"
+        product.save()
+        self.assertIsNone(get_fragment_cache().get(old_key))
+        response = self.client.get(reverse("products-web-table"))
+        self.assertContains(response, "Renamed")
+        self.assertNotContains(response, ">Cached<")
+
+    def test_key_changes_with_day_and_currency(self):
+        today = timezone.localdate()
+        base = fragment_key(self.product, "products/_row.html", "UZS", today)
+        self.assertNotEqual(
+            base,
+            fragment_key(self.product, "products/_row.html", "UZS", today + timedelta(days=1)),
+        )
+        self.assertNotEqual(base, fragment_key(self.product, "products/_row.html", "USD", today))
+
+
+class ProductImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        get_fragment_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            username="images",
+            password="strong-password",
+        )
+        self.client.force_login(self.user)
+
+    def _upload(self, name="photo.jpg", image_format="JPEG", size=(1600, 900)):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, color="orange").save(buffer, format=image_format)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_creates_resized_variants(self):
+        self.client.post(
+            reverse("products-web-new"),
+            {"name": "Photo", "price": "10", "image": self._upload()},
+            HTTP_HX_REQUEST="true",
+        )
+        product = Product.objects.get(name="Photo")
+        self.assertTrue(product.has_image_variants)
+        storage = product.image.storage
+        for variant, expected_width in (("thumb", 96), ("card", 192), ("full", 1200)):
+            stored = product.image_variants[variant]
+            self.assertTrue(stored["webp"].endswith(f"__{variant}.webp"))
+            self.assertTrue(stored["fallback"].endswith(f"__{variant}.jpg"))
+            with storage.open(stored["webp"]) as handle, Image.open(handle) as variant_image:
+                self.assertEqual(variant_image.format, "WEBP")
+                self.assertEqual(variant_image.width, expected_width)
+
+        response = self.client.get(reverse("products-web-table"))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, product.thumbnail_url)
+        self.assertNotContains(response, f'src="{product.image.url}"')
+
+    def test_replacing_image_rebuilds_variants(self):
+        product = Product.objects.create(name="Swap", price=Decimal("1"), image=self._upload("a.png", "PNG"))
+        first = product.image_variants
+        self.assertTrue(first["thumb"]["fallback"].endswith(".png"))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = self._upload("b.jpg")
+            product.save()
+        self.assertNotEqual(product.image_variants["source"], first["source"])
+        self.assertFalse(product.image.storage.exists(first["thumb"]["webp"]))
+
+    def test_product_without_variants_falls_back_to_original(self):
+        product = Product(name="Legacy", price=Decimal("1"))
+        product.image.name = "products/legacy.jpg"
+        self.assertFalse(product.has_image_variants)
+        self.assertEqual(product.thumbnail_url, product.image.url)
+        self.assertEqual(product.image_srcset, "")
+
+
+class AsyncImageUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.spool_root = tempfile.mkdtemp()
+        override = self.settings(
+            MEDIA_ROOT=self.media_root,
+            PRODUCT_IMAGE_UPLOAD_MODE="async",
+            PRODUCT_IMAGE_SPOOL_ROOT=self.spool_root,
+            PRODUCT_IMAGE_UPLOAD_BACKOFF=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.addCleanup(shutil.rmtree, self.spool_root, True)
+        self.user = get_user_model().objects.create_user(
+            username="uploader",
+            password="strong-password",
+        )
+        self.client.force_login(self.user)
+
+    def _upload(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 200), color="teal").save(buffer, format="PNG")
+        return SimpleUploadedFile("async.png", buffer.getvalue(), content_type="image/png")
+
+    def _create(self):
+        return self.client.post(
+            reverse("products-web-new"),
+            {"name": "Async", "price": "10", "image": self._upload()},
+            HTTP_HX_REQUEST="true",
+        )
+
+    def test_row_is_committed_pending_then_published(self):
+        with mock.patch("products.uploads.get_upload_queue") as queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._create()
+        self.assertEqual(response.status_code, 200)
+        product = Product.objects.get(name="Async")
+        self.assertEqual(product.image_state, Product.ImageState.PENDING)
+        self.assertFalse(product.image)
+        self.assertTrue(os.path.exists(os.path.join(self.spool_root, product.image_spool)))
+        queue.return_value.submit.assert_called_once()
+
+        row = self.client.get(reverse("products-web-row", args=[product.pk]))
+        self.assertContains(row, 'hx-trigger="every 3s"')
+
+        upload_spooled_image(product.pk, product.image_spool)
+        product.refresh_from_db()
+        self.assertEqual(product.image_state, Product.ImageState.READY)
+        self.assertTrue(product.has_image_variants)
+        self.assertTrue(product.image.storage.exists(product.image.name))
+        self.assertEqual(os.listdir(self.spool_root), [])
+
+        row = self.client.get(reverse("products-web-row", args=[product.pk]))
+        self.assertNotContains(row, "every 3s")
+        self.assertContains(row, product.thumbnail_url)
+
+    def test_failed_attempts_are_retried_then_marked_failed(self):
+        with mock.patch("products.uploads.get_upload_queue"):
+            self._create()
+        product = Product.objects.get(name="Async")
+        with (
+            mock.patch("products.uploads._publish", side_effect=OSError("R2 down")) as publish,
+            self.assertLogs("products.uploads", "WARNING"),
+        ):
+            upload_spooled_image(product.pk, product.image_spool)
+        self.assertEqual(publish.call_count, 3)
+        product.refresh_from_db()
+        self.assertEqual(product.image_state, Product.ImageState.FAILED)
+
+    def test_failed_upload_row_stops_polling(self):
+        with mock.patch("products.uploads.get_upload_queue"):
+            self._create()
+        product = Product.objects.get(name="Async")
+        row_url = reverse("products-web-row", args=[product.pk])
+        self.assertContains(self.client.get(row_url), 'hx-trigger="every 3s"')
+
+        with (
+            mock.patch("products.uploads._publish", side_effect=OSError("R2 down")),
+            self.assertLogs("products.uploads", "WARNING"),
+        ):
+            upload_spooled_image(product.pk, product.image_spool)
+        self.assertNotContains(self.client.get(row_url), "every 3s")
+
+    def test_transient_failure_recovers(self):
+        with mock.patch("products.uploads.get_upload_queue"):
+            self._create()
+        product = Product.objects.get(name="Async")
+        real_publish = uploads._publish
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OSError("timeout")
+            return real_publish(*args)
+
+        with (
+            mock.patch("products.uploads._publish", side_effect=flaky),
+            self.assertLogs("products.uploads", "WARNING"),
+        ):
+            upload_spooled_image(product.pk, product.image_spool)
+        product.refresh_from_db()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(product.image_state, Product.ImageState.READY)
+
+
+class ImageBlobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.storage = Product._meta.get_field("image").storage
+
+    def _png(self, color="purple"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (320, 240), color=color).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def _create(self, name, content, filename="photo.png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name=name, price=Decimal("1"), image=SimpleUploadedFile(filename, content, content_type="image/png")
+            )
+
+    def test_image_is_named_by_content_hash(self):
+        product = self._create("Hashed", self._png(), filename="Supplier Photo.PNG")
+        self.assertTrue(blobs.is_blob_name(product.image.name))
+        self.assertRegex(product.image.name, r"^products/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+        blob = ImageBlob.objects.get(name=product.image.name)
+        self.assertEqual(blob.refcount, 1)
+        self.assertEqual(blob.variants, product.image_variants)
+
+    def test_identical_upload_is_not_stored_again(self):
+        content = self._png()
+        first = self._create("First", content)
+        with mock.patch.object(self.storage, "save", wraps=self.storage.save) as save:
+            second = self._create("Second", content, filename="other-name.png")
+        save.assert_not_called()
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refcount, 2)
+
+    def test_existing_file_without_a_row_is_not_uploaded(self):
+        content = self._png()
+        name = self._create("Orphan", content).image.name
+        ImageBlob.objects.all().delete()
+        with mock.patch.object(self.storage, "save", wraps=self.storage.save) as save:
+            stored = blobs.store(self.storage, "products", io.BytesIO(content), "again.png")
+        self.assertEqual(stored, name)
+        save.assert_not_called()
+
+    def test_shared_blob_is_deleted_with_its_last_product(self):
+        content = self._png()
+        first = self._create("First", content)
+        second = self._create("Second", content)
+        name, thumb = first.image.name, first.image_variants["thumb"]["webp"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(thumb))
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(self.storage.exists(thumb))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_replacing_a_shared_image_keeps_it_for_the_others(self):
+        content = self._png()
+        first = self._create("First", content)
+        second = self._create("Second", content)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image = SimpleUploadedFile("new.png", self._png("green"), content_type="image/png")
+            second.save()
+        self.assertNotEqual(second.image.name, first.image.name)
+        self.assertTrue(self.storage.exists(first.image.name))
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refcount, 1)
+        self.assertEqual(ImageBlob.objects.get(name=second.image.name).refcount, 1)
+
+    def test_bulk_delete_releases_each_reference(self):
+        content = self._png()
+        products = [self._create(f"Bulk {index}", content) for index in range(3)]
+        name = products[0].image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.bulk_delete([product.pk for product in products[:2]])
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.bulk_delete([products[2].pk])
+        self.assertFalse(self.storage.exists(name))
+
+    def test_seeded_placeholders_are_counted_blobs(self):
+        bulk_seed(30, batch_size=10, seed=5, with_images=True)
+        products = list(Product.objects.all())
+        self.assertTrue(all(blobs.is_blob_name(product.image.name) for product in products))
+        for blob in ImageBlob.objects.all():
+            users = [product for product in products if product.image.name == blob.name]
+            self.assertEqual(blob.refcount, len(users))
+            self.assertTrue(all(product.image_variants == blob.variants for product in users))
+
+        victim = products[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            victim.delete()
+        for product in products[1:]:
+            self.assertTrue(self.storage.exists(product.image.name))
+            self.assertTrue(self.storage.exists(product.image_variants["thumb"]["webp"]))
+
+    def test_legacy_image_keeps_its_name_and_loses_only_variants(self):
+        legacy = self.storage.save("products/legacy.png", io.BytesIO(self._png()))
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Legacy", price=Decimal("1"), image=legacy)
+        self.assertEqual(product.image.name, legacy)
+        self.assertFalse(ImageBlob.objects.exists())
+        thumb = product.image_variants["thumb"]["webp"]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertFalse(self.storage.exists(thumb))
+        self.assertTrue(self.storage.exists(legacy))
+
+
+class BulkSeedTests(TestCase):
+    def test_bulk_seed_is_deterministic_and_indexed(self):
+        result = bulk_seed(120, batch_size=50, seed=7)
+        self.assertEqual(result.created, 120)
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(stats.get_stats().total, 120)
+
+        names = [product.name for product in generate_products(120, seed=7)]
+        self.assertCountEqual(Product.objects.values_list("name", flat=True), names)
+        self.assertEqual(names, [product.name for product in generate_products(120, seed=7)])
+
+        first = Product.objects.order_by("created_at").first()
+        backend = get_search_backend(Product)
+        matches = backend.filter(Product.objects.all(), first.name.split(" #")[0])
+        self.assertIn(first, matches)
+
+    def test_created_at_is_spread_and_ids_follow_it(self):
+        products = list(generate_products(200, seed=1, days=30))
+        created = [product.created_at for product in products]
+        self.assertEqual(created, sorted(created))
+        self.assertGreater(created[-1] - created[0], timedelta(days=20))
+        self.assertEqual([product.id for product in products], sorted(product.id for product in products))
+
+    def test_command_reports_throughput(self):
+        out = io.StringIO()
+        call_command("seed_products", "--bulk", "--count", "30", "--batch-size", "10", stdout=out)
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(Product.objects.count(), 30)
+
+    def test_deleting_a_seeded_product_keeps_shared_placeholders(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        with self.settings(MEDIA_ROOT=media_root):
+            bulk_seed(40, seed=3, with_images=True)
+            products = list(Product.objects.order_by("created_at"))
+            victim = products[0]
+            sharing = [product for product in products[1:] if product.image.name == victim.image.name]
+            self.assertGreaterEqual(len(sharing), 2)
+            with self.captureOnCommitCallbacks(execute=True):
+                victim.delete()
+            with self.captureOnCommitCallbacks(execute=True):
+                sharing[0].image = ""
+                sharing[0].save()
+            survivor = Product.objects.get(pk=sharing[-1].pk)
+            self.assertTrue(survivor.has_image_variants)
+            storage = survivor.image.storage
+            self.assertTrue(storage.exists(survivor.image.name))
+            for variant in ("thumb", "card", "full"):
+                self.assertTrue(storage.exists(survivor.image_variants[variant]["webp"]))
+
+
+class ImportProductsCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.existing = Product.objects.create(name="Eski nom", price=Decimal("5.00"))
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def _run(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_products", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_upserts_and_rejects(self):
+        path = self._write(
+            "catalog.csv",
+            "id,name,price\n"
+            f"{self.existing.pk},Yangi nom,7.50\n"
+            ",Olma sharbati,12000\n"
+            ",,3\n"
+            ",Manfiy narx,-1\n"
+            "not-a-uuid,Nok,4\n",
+        )
+        out, err = self._run(path, "--batch-size", "2")
+        self.assertIn("Created 1, updated 1, rejected 3", out)
+        self.assertIn("Line 4: name", err)
+        self.assertIn("Line 5: price", err)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Yangi nom")
+        self.assertEqual(self.existing.search_name, "yangi nom")
+        self.assertEqual(self.existing.price, Decimal("7.50"))
+        self.assertTrue(Product.objects.filter(name="Olma sharbati").exists())
+        self.assertEqual(stats.get_stats().total, 2)
+
+    def test_jsonl_last_row_for_an_id_wins(self):
+        path = self._write(
+            "catalog.jsonl",
+            json.dumps({"id": str(self.existing.pk), "name": "Birinchi", "price": "1"}) + "\n"
+            + json.dumps({"id": str(self.existing.pk), "name": "Ikkinchi", "price": "2"}) + "\n"
+            + "[1, 2]\n",
+        )
+        out, err = self._run(path)
+        self.assertIn("Created 0, updated 1, rejected 1", out)
+        self.assertIn("not a JSON object", err)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Ikkinchi")
+
+    def test_imported_rows_are_searchable(self):
+        path = self._write("catalog.csv", "name,price\nO‘zbek non,3000\n")
+        self._run(path)
+        backend = get_search_backend(Product)
+        self.assertEqual(backend.filter(Product.objects.all(), "ozbek").get().name, "O‘zbek non")
+
+
+class ProductExportViewTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="export", password="strong-password")
+        self.client.force_login(user)
+        Product.objects.create(name="Olma", price=Decimal("10.00"))
+        Product.objects.create(name="Nok", price=Decimal("25.50"))
+
+    def _content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(reverse("products-web-export"), {"q": "olma"})
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        lines = self._content(response).decode("utf-8").splitlines()
+        self.assertEqual(lines[0], "id,name,price,created_at,updated_at")
+        self.assertEqual(len(lines), 2)
+        self.assertIn(",Olma,10.00,", lines[1])
+
+    def test_jsonl_export_can_be_gzipped(self):
+        response = self.client.get(
+            reverse("products-web-export"), {"format": "jsonl", "sort": "price", "compress": "gzip"}
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertTrue(response["Content-Disposition"].endswith('.jsonl.gz"'))
+        records = [json.loads(line) for line in gzip.decompress(self._content(response)).splitlines()]
+        self.assertEqual([record["name"] for record in records], ["Nok", "Olma"])
+        self.assertEqual(records[0]["price"], "25.50")
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("products-web-export"))
+        self.assertEqual(response.status_code, 302)
+
+
+class ProductBenchmarkTests(TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        samples = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(samples, 0.5), 3.0)
+        self.assertEqual(percentile(samples, 0.95), 5.0)
+
+    def test_benchmark_reports_every_scenario(self):
+        report = benchmark_catalog(40, iterations=2)
+        self.assertEqual(report["size"], 40)
+        scenarios = report["scenarios"]
+        self.assertEqual(
+            set(scenarios),
+            {
+                "list",
+                "table_first_page",
+                "table_search",
+                "table_sort_price",
+                "table_cards",
+                "table_deep_page",
+                "create",
+                "update",
+                "delete",
+            },
+        )
+        for name, result in scenarios.items():
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"], name)
+            self.assertGreater(result["queries"], 0, name)
+            self.assertTrue(all(code < 400 for code in result["status_codes"]), name)
+        self.assertEqual(Product.objects.filter(name__startswith="Benchmark product").count(), 0)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="profiler", password="strong-password")
+        self.client.force_login(self.user)
+        Product.objects.create(name="Olma", price=Decimal("10.00"))
+        profiling.view_stats.reset()
+
+    def test_server_timing_header(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("products-web-list"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertIn("storage;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_server_timing_header_is_for_staff_unless_enabled(self):
+        url = reverse("products-web-list")
+        self.assertNotIn("Server-Timing", self.client.get(url))
+        self.client.logout()
+        self.assertNotIn("Server-Timing", self.client.get(url))
+        with self.settings(PROFILING_SERVER_TIMING=True):
+            self.assertIn("Server-Timing", self.client.get(url))
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get(reverse("products-web-table"), HTTP_HX_REQUEST="true")
+        self.assertEqual(self.client.get(reverse("products-profiling")).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        payload = self.client.get(reverse("products-profiling")).json()
+        table = payload["views"]["products-web-table"]
+        self.assertEqual(table["count"], 1)
+        self.assertGreater(table["mean_queries"], 0)
+        self.assertEqual(table["histogram"]["inf"], 1)
+
+        self.assertEqual(self.client.post(reverse("products-profiling")).status_code, 204)
+        self.assertNotIn("products-web-table", profiling.snapshot())
+
+    @override_settings(PROFILING_SLOW_REQUEST_MS=1)
+    def test_slow_requests_are_logged_with_sql(self):
+        with mock.patch.object(profiling.RequestProfile, "elapsed_ms", return_value=900.0):
+            with self.assertLogs("products.profiling", "WARNING") as logs:
+                self.client.get(reverse("products-web-list"))
+        self.assertIn("Slow request GET /", logs.output[0])
+        self.assertIn("products_product", logs.output[0])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="etag", password="strong-password")
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="Olma", price=Decimal("10.00"))
+
+    def test_every_write_bumps_the_catalog_version(self):
+        versions = [stats.get_version()]
+        self.product.name = "Nok"
+        self.product.save(update_fields=["name", "search_name", "updated_at"])
+        versions.append(stats.get_version())
+        self.product.delete()
+        versions.append(stats.get_version())
+        stats.rebuild()
+        versions.append(stats.get_version())
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_table_revalidates_without_querying_products(self):
+        url = reverse("products-web-table")
+        first = self.client.get(url, {"q": "olma"})
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, {"q": "olma"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertFalse(any('"products_product"' in query["sql"] for query in queries.captured_queries))
+
+        self.assertNotEqual(self.client.get(url, {"q": "nok"})["ETag"], etag)
+        self.assertNotEqual(self.client.get(url)["ETag"], self.client.get(url, {"q": ""})["ETag"])
+
+    def test_product_write_invalidates_etag(self):
+        url = reverse("products-web-table")
+        etag = self.client.get(url)["ETag"]
+        self.product.price = Decimal("12.00")
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_page_etag_is_per_user(self):
+        url = reverse("products-web-list")
+        self.client.get(url)  # sets the CSRF cookie the page embeds
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        other = get_user_model().objects.create_user(username="etag-other", password="strong-password")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TypeaheadIndexTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(typeahead, "_index", typeahead.TypeaheadIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.olma = Product.objects.create(name="Olma sharbati", price=Decimal("1"))
+        Product.objects.create(name="Olcha murabbo", price=Decimal("1"))
+        Product.objects.create(name="Qizil olma", price=Decimal("1"))
+
+    def names(self, query, limit=8):
+        return [suggestion.name for suggestion in typeahead.get_index().suggest(query, limit)]
+
+    def test_prefix_lookup_needs_no_queries(self):
+        typeahead.get_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names("ol"), ["Olcha murabbo", "Olma sharbati", "Qizil olma"])
+            self.assertEqual(self.names("ol", limit=1), ["Olcha murabbo"])
+            self.assertEqual(self.names("qizil ol"), ["Qizil olma"])
+            self.assertEqual(self.names("nok"), [])
+
+    def test_local_writes_apply_on_commit_without_reload(self):
+        index = typeahead.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.olma.name = "Nok sharbati"
+            self.olma.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Olxo‘ri", price=Decimal("1"))
+        self.assertEqual(index.version, stats.get_version())
+        with mock.patch.object(index, "load") as load:
+            with self.settings(TYPEAHEAD_VERSION_CHECK_SECONDS=0):
+                typeahead.get_index()
+        load.assert_not_called()
+        self.assertEqual(self.names("ol"), ["Olcha murabbo", "Qizil olma", "Olxo‘ri"])
+        self.assertIn("Nok sharbati", self.names("nok"))
+        self.assertNotIn("Olma sharbati", self.names("olma"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.olma.delete()
+        self.assertEqual(self.names("nok"), [])
+
+    def write_from_another_worker(self):
+        with mock.patch.object(typeahead, "_index", typeahead.TypeaheadIndex()):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.olma.name = "Anor"
+                self.olma.save()
+                Product.objects.get(name="Qizil olma").delete()
+                Product.objects.create(name="Olxo‘ri", price=Decimal("1"))
+
+    def test_writes_from_other_workers_sync_without_reload(self):
+        index = typeahead.get_index()
+        self.write_from_another_worker()
+        with mock.patch.object(index, "load") as load:
+            with self.settings(TYPEAHEAD_VERSION_CHECK_SECONDS=0):
+                typeahead.get_index()
+        load.assert_not_called()
+        self.assertEqual(index.version, stats.get_version())
+        self.assertEqual(self.names("anor"), ["Anor"])
+        self.assertEqual(self.names("ol"), ["Olcha murabbo", "Olxo‘ri"])
+
+    def test_large_syncs_rebuild_the_index(self):
+        index = typeahead.get_index()
+        self.write_from_another_worker()
+        with mock.patch.object(index, "load", wraps=index.load) as load:
+            with self.settings(TYPEAHEAD_VERSION_CHECK_SECONDS=0, TYPEAHEAD_MAX_SYNC_ROWS=1):
+                typeahead.get_index()
+        load.assert_called_once()
+        self.assertEqual(index.version, stats.get_version())
+        self.assertEqual(self.names("ol"), ["Olcha murabbo", "Olxo‘ri"])
+
+    def test_autocomplete_endpoint_renders_suggestions(self):
+        user = get_user_model().objects.create_user(username="typeahead", password="strong-password")
+        self.client.force_login(user)
+        response = self.client.get(reverse("products-web-autocomplete"), {"q": "qizil"})
+        self.assertContains(response, "Qizil olma")
+        self.assertNotContains(response, "Olcha murabbo")
+
+
+class AsyncViewParityTests(TestCase):
+    csrf_re = re.compile(r'(name="csrf-token" content|name="csrfmiddlewaretoken" value)="[^"]*"')
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="async", password="strong-password")
+        for index in range(20):
+            Product.objects.create(name=f"Olma {index}", price=Decimal(index + 1))
+        Product.objects.create(name="Nok", price=Decimal("99"))
+
+    def make_request(self, path, params, user=None):
+        request = RequestFactory().get(path, params, headers={"HX-Request": "true"})
+        request.user = user or self.user
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return request
+
+    def normalize(self, response):
+        return self.csrf_re.sub(r"\1=\"\"", response.content.decode())
+
+    def render_sync(self, view, path, params):
+        response = view.as_view()(self.make_request(path, params))
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    async def assert_parity(self, sync_view, async_view, path, params):
+        sync_response = await sync_to_async(self.render_sync)(sync_view, path, params)
+        async_response = await async_view.as_view()(self.make_request(path, params))
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(self.normalize(async_response), self.normalize(sync_response))
+        for header in ("ETag", "HX-Trigger", "Cache-Control"):
+            self.assertEqual(async_response.get(header), sync_response.get(header), header)
+        return async_response
+
+    async def test_table_partial_parity(self):
+        path = reverse("products-web-table")
+        first = await self.assert_parity(ProductTablePartialView, AsyncProductTablePartialView, path, {})
+        cursor = re.search(r"cursor=([\w-]+)", first.content.decode()).group(1)
+        for params in ({"q": "olma"}, {"sort": "price"}, {"view": "cards"}, {"cursor": cursor}, {"cursor": cursor, "view": "cards"}):
+            with self.subTest(params=params):
+                await self.assert_parity(ProductTablePartialView, AsyncProductTablePartialView, path, params)
+
+    async def test_list_parity(self):
+        path = reverse("products-web-list")
+        for params in ({}, {"q": "nok"}, {"sort": "price"}):
+            with self.subTest(params=params):
+                await self.assert_parity(ProductListView, AsyncProductListView, path, params)
+
+    async def test_async_views_require_login(self):
+        request = self.make_request(reverse("products-web-table"), {}, user=AnonymousUser())
+        response = await AsyncProductTablePartialView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
+
+    async def test_async_invalid_cursor_is_404(self):
+        from django.http import Http404
+
+        request = self.make_request(reverse("products-web-table"), {"cursor": "!!"})
+        with self.assertRaises(Http404):
+            await AsyncProductTablePartialView.as_view()(request)
+
+
+class ProductOOBSwapTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="oob", password="strong-password")
+        self.client.force_login(user)
+        self.product = Product.objects.create(name="Swapped", price=Decimal("5.00"))
+
+    def test_htmx_create_returns_oob_fragments(self):
+        response = self.client.post(
+            reverse("products-web-new"),
+            {"name": "HTMX Product", "price": "12.00"},
+            HTTP_HX_REQUEST="true",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["HX-Reswap"], "none")
+        self.assertNotIn("reloadProducts", response["HX-Trigger"])
+        product = Product.objects.get(name="HTMX Product")
+        self.assertContains(response, 'hx-swap-oob="afterbegin:#products-tbody"')
+        self.assertContains(response, 'hx-swap-oob="afterbegin:#products-cards-container"')
+        self.assertContains(response, f'id="product-row-{product.pk}"')
+        self.assertContains(response, f'id="product-card-{product.pk}"')
+        self.assertContains(response, 'id="product-stats"')
+
+    def test_htmx_create_reloads_a_sorted_or_filtered_list(self):
+        for view in ({"sort": "price"}, {"q": "olma"}, {"stock": "low"}):
+            response = self.client.post(
+                reverse("products-web-new"),
+                {"name": "Olma", "price": "12.00", **view},
+                HTTP_HX_REQUEST="true",
+            )
+            self.assertEqual(response.status_code, 200, view)
+            self.assertTrue(json.loads(response["HX-Trigger"])["reloadProducts"], view)
+            self.assertNotContains(response, "afterbegin:", msg_prefix=str(view))
+            self.assertNotContains(response, 'id="product-row-', msg_prefix=str(view))
+            if view.get("sort"):
+                self.assertContains(response, 'id="product-stats"')
+            else:
+                # A filtered list shows its own summary, not the whole catalog's.
+                self.assertNotContains(response, 'id="product-stats"', msg_prefix=str(view))
+
+        response = self.client.post(
+            reverse("products-web-edit", args=[self.product.pk]),
+            {"name": "Renamed", "price": "7.00", "q": "renamed"},
+            HTTP_HX_REQUEST="true",
+        )
+        self.assertContains(response, f'id="product-row-{self.product.pk}"')
+        self.assertNotContains(response, 'id="product-stats"')
+
+    def test_htmx_update_swaps_only_that_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("products-web-edit", args=[self.product.pk]),
+                {"name": "Renamed", "price": "7.00"},
+                HTTP_HX_REQUEST="true",
+            )
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertEqual(len(re.findall(rf'<tr id="product-row-{self.product.pk}"[^>]*hx-swap-oob="true"', html)), 1)
+        self.assertEqual(len(re.findall(rf'<div id="product-card-{self.product.pk}"[^>]*hx-swap-oob="true"', html)), 1)
+        self.assertIn("Renamed", html)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries.captured_queries))
+
+    def test_htmx_delete_removes_row_and_card(self):
+        pk = self.product.pk
+        response = self.client.post(reverse("products-web-delete", args=[pk]), HTTP_HX_REQUEST="true")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'<tr id="product-row-{pk}" hx-swap-oob="delete"></tr>', html=False)
+        self.assertContains(response, f'<div id="product-card-{pk}" hx-swap-oob="delete"></div>', html=False)
+        self.assertContains(response, 'hx-swap-oob="true"')
+        self.assertEqual(json.loads(response["HX-Trigger"])["showToast"]["message"], "Mahsulot o‘chirildi")
+        self.assertFalse(Product.objects.filter(pk=pk).exists())
+
+
+class ProductBulkActionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="bulk", password="strong-password")
+        self.client.force_login(self.user)
+        self.products = [
+            Product.objects.create(name=f"Bulk {index}", price=Decimal(price))
+            for index, price in enumerate(["10.00", "20.00", "30.00", "40.00"])
+        ]
+        self.url = reverse("products-web-bulk")
+
+    def post(self, action, products, value=""):
+        return self.client.post(
+            self.url,
+            {"action": action, "ids": [str(product.pk) for product in products], "value": value},
+            HTTP_HX_REQUEST="true",
+        )
+
+    def prices(self):
+        return list(Product.objects.order_by("name").values_list("price", flat=True))
+
+    def test_bulk_delete_is_one_delete_with_one_toast(self):
+        version = stats.get_version()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post("delete", self.products[:3])
+        self.assertEqual(response.status_code, 204)
+        trigger = json.loads(response["HX-Trigger"])
+        self.assertTrue(trigger["reloadProducts"])
+        self.assertEqual(trigger["showToast"]["message"], "3 ta mahsulot o‘chirildi")
+        deletes = [query for query in queries.captured_queries if query["sql"].startswith('DELETE FROM "products_product"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(list(Product.objects.all()), [self.products[3]])
+        summary = stats.get_stats()
+        self.assertEqual((summary.total, summary.price_sum), (1, Decimal("40.00")))
+        self.assertEqual(summary.version, version + 1)
+
+    def test_set_and_adjust_price(self):
+        self.assertEqual(self.post("set_price", self.products[:2], "15.50").status_code, 204)
+        self.assertEqual(self.prices(), [Decimal("15.50"), Decimal("15.50"), Decimal("30.00"), Decimal("40.00")])
+        self.post("adjust_percent", self.products[2:], "12.5")
+        self.assertEqual(self.prices()[2:], [Decimal("33.75"), Decimal("45.00")])
+        self.post("adjust_amount", self.products, "-20")
+        self.assertEqual(self.prices(), [Decimal("0.00"), Decimal("0.00"), Decimal("13.75"), Decimal("25.00")])
+        summary = stats.get_stats()
+        self.assertEqual((summary.price_min, summary.price_max), (Decimal("0.00"), Decimal("25.00")))
+
+    def test_bulk_stats_are_deltas_unless_an_edge_moves(self):
+        def catalog_scans(action, products, value=""):
+            version = stats.get_version()
+            with CaptureQueriesContext(connection) as queries:
+                self.post(action, products, value)
+            self.assertEqual(stats.get_version(), version + 1)
+            return [
+                query["sql"]
+                for query in queries.captured_queries
+                if re.search(r'(SUM|MIN|MAX)\("products_product"|COUNT\(\*\) AS "__count" FROM "products_product"', query["sql"])
+            ]
+
+        # Neither the cheapest, dearest nor newest product: no aggregate at all.
+        self.assertEqual(catalog_scans("adjust_amount", self.products[1:3], "1"), [])
+        self.assertEqual(catalog_scans("delete", self.products[1:2]), [])
+        # Deleting the cheapest re-reads the price bounds, but never counts the catalog.
+        scans = catalog_scans("delete", self.products[:1])
+        self.assertTrue(scans)
+        self.assertFalse(any("COUNT(" in sql for sql in scans))
+
+        incremental, rebuilt = stats.get_stats(), stats.rebuild()
+        for field in ("total", "newest_product_id", "price_min", "price_max", "price_sum"):
+            self.assertEqual(getattr(incremental, field), getattr(rebuilt, field), field)
+
+    def test_price_update_is_one_update_and_moves_updated_at(self):
+        before = self.products[0].updated_at
+        with CaptureQueriesContext(connection) as queries:
+            self.post("adjust_amount", self.products, "1")
+        updates = [query for query in queries.captured_queries if query["sql"].startswith('UPDATE "products_product"')]
+        self.assertEqual(len(updates), 1)
+        self.products[0].refresh_from_db()
+        self.assertGreater(self.products[0].updated_at, before)
+
+    def test_bulk_delete_keeps_typeahead_current(self):
+        index = typeahead.TypeaheadIndex()
+        with mock.patch.object(typeahead, "_index", index):
+            index.load()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post("delete", self.products[:2])
+            self.assertEqual(index.version, stats.get_version())
+            self.assertEqual([suggestion.name for suggestion in index.suggest("bulk")], ["Bulk 2", "Bulk 3"])
+
+    def test_invalid_requests_change_nothing(self):
+        cases = [
+            ("delete", [], ""),
+            ("set_price", self.products, ""),
+            ("set_price", self.products, "-1"),
+            ("adjust_percent", self.products, "-100"),
+            ("rename", self.products, "1"),
+        ]
+        for action, products, value in cases:
+            with self.subTest(action=action, value=value):
+                response = self.post(action, products, value)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response["HX-Trigger"])["showToast"]["type"], "error")
+        response = self.client.post(self.url, {"action": "delete", "ids": ["not-a-uuid"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.count(), 4)
+        self.assertEqual(self.prices()[0], Decimal("10.00"))
+
+    def test_rows_and_cards_have_checkboxes(self):
+        response = self.client.get(reverse("products-web-list"))
+        self.assertContains(response, 'id="bulk-form"')
+        self.assertContains(response, f'name="ids" value="{self.products[0].pk}" form="bulk-form"', count=2)
+
+
+class ProductEventFeedTests(TestCase):
+    def setUp(self):
+        self.backend = events.LocalBackend()
+        patcher = mock.patch.object(events, "_backend", self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writes_publish_one_event_each_with_consecutive_versions(self):
+        published = []
+        with mock.patch.object(self.backend, "publish", lambda event, using: published.append(event)):
+            product = Product.objects.create(name="Olma", price=Decimal("1.00"))
+            product.price = Decimal("2.00")
+            product.save()
+            pk = product.pk
+            product.delete()
+        self.assertEqual([event.kind for event in published], ["created", "updated", "deleted"])
+        self.assertEqual({event.id for event in published}, {str(pk)})
+        versions = [event.version for event in published]
+        self.assertEqual(versions, list(range(versions[0], versions[0] + 3)))
+        self.assertEqual(versions[-1], stats.get_version())
+
+    async def test_import_notifies_subscribers_once(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = os.path.join(directory, "catalog.csv")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("name,price\nOlma,1\nNok,2\n")
+        subscription = self.backend.subscribe()
+        self.addCleanup(self.backend.unsubscribe, subscription)
+
+        def run_import():
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_products", path, stdout=io.StringIO())
+
+        await sync_to_async(run_import)()
+        event = await asyncio.wait_for(subscription.get(), timeout=5)
+        self.assertEqual(event.kind, "reload")
+        self.assertEqual(event.version, await stats.aget_version())
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.queue.empty())
+
+    def test_bulk_action_publishes_a_single_reload(self):
+        products = [Product.objects.create(name=f"Bulk {index}", price=Decimal("1.00")) for index in range(3)]
+        published = []
+        with mock.patch.object(self.backend, "publish", lambda event, using: published.append(event)):
+            bulk.bulk_delete([product.pk for product in products])
+        self.assertEqual([event.kind for event in published], ["reload"])
+
+    def test_events_are_delivered_only_after_commit(self):
+        with mock.patch.object(self.backend, "deliver") as deliver:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Product.objects.create(name="Nok", price=Decimal("1.00"))
+            deliver.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertEqual(deliver.call_args.args[0].kind, "created")
+
+    async def test_stream_sends_events_to_subscribers(self):
+        user = await get_user_model().objects.acreate(username="events")
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse("products-web-events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        await sync_to_async(self.backend.deliver)(events.ProductEvent("updated", version=7, id="abc"))
+        chunk = (await asyncio.wait_for(pending, timeout=5)).decode()
+        self.assertTrue(chunk.startswith("id: 7\nevent: product\ndata: "))
+        self.assertEqual(json.loads(chunk.split("data: ", 1)[1]), {"kind": "updated", "version": 7, "id": "abc"})
+
+    async def test_closed_stream_unsubscribes(self):
+        stream = ProductEventStreamView().stream()
+        await anext(stream)
+        self.assertEqual(len(self.backend._subscribers), 1)
+        await stream.aclose()
+        self.assertFalse(self.backend._subscribers)
+
+    async def test_slow_subscriber_gets_a_reload_instead_of_a_backlog(self):
+        with override_settings(PRODUCT_EVENTS_QUEUE_SIZE=2):
+            subscription = self.backend.subscribe()
+        for version in range(1, 5):
+            subscription.push(events.ProductEvent("updated", version=version, id="x"))
+        self.assertEqual(await subscription.get(), events.ProductEvent("reload", version=3))
+        self.assertEqual((await subscription.get()).version, 4)
+
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        user = get_user_model().objects.create_user(username="events", password="strong-password")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("products-web-events")).status_code, 204)
+
+
+class RowRenderingTests(TestCase):
+    def test_prices_match_the_filter(self):
+        values = [Decimal("0"), Decimal("999.99"), Decimal("1234"), Decimal("1234567.50"), None]
+        self.assertEqual(format_prices(values), [format_price(value) for value in values])
+        self.assertEqual(format_price(Decimal("1234567.50")), "1\xa0234\xa0567")
+        self.assertEqual(format_prices([]), [])
+
+    @override_settings(TIME_ZONE="Asia/Tashkent")
+    def test_date_labels_follow_the_local_day(self):
+        midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        labels = DateLabels(midnight.date())
+        self.assertEqual(labels(midnight), "Bugun")
+        self.assertEqual(labels(midnight - timedelta(microseconds=1)), "Kecha")
+        self.assertEqual(labels(midnight - timedelta(days=1)), "Kecha")
+        older = midnight - timedelta(days=1, seconds=1)
+        self.assertEqual(labels(older), timezone.localtime(older).strftime("%d.%m.%Y"))
+        self.assertEqual(labels(None), "")
+
+    def test_batched_render_matches_per_row_filters(self):
+        now = timezone.now()
+        products = [
+            Product.objects.create(name=f"Row {days}", price=Decimal("12345.67"), created_at=now - timedelta(days=days))
+            for days in (0, 1, 5)
+        ]
+        for template_name in FRAGMENT_TEMPLATES:
+            with self.subTest(template_name=template_name):
+                batched = render_uncached(products, template_name, "UZS")
+                per_row = [render_to_string(template_name, {"product": product, "currency": "UZS"}) for product in products]
+                self.assertEqual(batched, per_row)
+                self.assertIn("12\xa0345 UZS", batched[0])
+
+    def test_row_rendering_benchmark_reports_both_paths(self):
+        result = benchmark_row_rendering(rows=3, iterations=2)
+        self.assertEqual(set(result), {"per_row_filters", "batched", "rows", "iterations", "speedup"})
+        self.assertGreater(result["batched"]["p50_us_per_row"], 0)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="stock", password="strong-password")
+        self.client.force_login(user)
+        self.product = Product.objects.create(name="Shelf", price=Decimal("5.00"))
+
+    def test_movements_are_signed_and_fold_preserves_on_hand(self):
+        stock.record_movement(self.product.pk, StockMovement.Kind.RECEIVE, 10)
+        stock.record_movement(self.product.pk, StockMovement.Kind.SELL, 3)
+        stock.record_movement(self.product.pk, StockMovement.Kind.ADJUST, -2, note="Singan")
+        self.assertEqual(
+            list(StockMovement.objects.order_by("id").values_list("quantity", flat=True)), [10, -3, -2]
+        )
+        self.assertEqual(stock.on_hand(self.product.pk), 5)
+
+        self.assertGreater(stock.fold(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertFalse(StockShard.objects.exclude(delta=0).exists())
+        self.assertEqual(stock.on_hand(self.product.pk), 5)
+        self.assertEqual(stock.fold(), 0)
+
+    def test_product_save_does_not_overwrite_stock(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=self.product.pk).update(stock=7)
+        stale.name = "Renamed"
+        stale.save()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 7)
+
+    @override_settings(INVENTORY_LOW_STOCK_THRESHOLD=5)
+    def test_low_stock_filter(self):
+        stocked = Product.objects.create(name="Stocked", price=Decimal("5.00"))
+        stock.record_movement(stocked.pk, StockMovement.Kind.RECEIVE, 50)
+        response = self.client.get(reverse("products-web-table"), {"stock": "low"})
+        self.assertContains(response, f'id="product-row-{self.product.pk}"')
+        self.assertNotContains(response, f'id="product-row-{stocked.pk}"')
+        self.assertContains(response, "Kam qoldi")
+
+    @override_settings(INVENTORY_LOW_STOCK_THRESHOLD=5)
+    def test_low_stock_page_summarizes_the_filtered_list(self):
+        stocked = Product.objects.create(name="Stocked", price=Decimal("5.00"))
+        stock.record_movement(stocked.pk, StockMovement.Kind.RECEIVE, 50)
+        summary = self.client.get(reverse("products-web-list"), {"stock": "low"}).context["stats"]
+        self.assertEqual(summary["total"], 1)
+        self.assertEqual(summary["last_product"], self.product)
+        self.assertEqual(self.client.get(reverse("products-web-list")).context["stats"]["total"], 2)
+
+    def test_low_stock_filter_sees_unfolded_movements_both_ways(self):
+        emptied = Product.objects.create(name="Emptied", price=Decimal("5.00"))
+        stock.record_movement(emptied.pk, StockMovement.Kind.RECEIVE, 50)
+        stock.record_movement(self.product.pk, StockMovement.Kind.RECEIVE, 3)
+        stock.fold()
+        stock.record_movement(emptied.pk, StockMovement.Kind.SELL, 48)
+        stock.record_movement(self.product.pk, StockMovement.Kind.RECEIVE, 20)
+
+        low = stock.filter_low_stock(stock.with_on_hand(Product.objects.all()), threshold=5)
+        self.assertEqual(list(low), [emptied])
+        self.assertIn("UNION", str(low.query))
+
+    def test_stock_movement_changes_row_fragment_and_etag(self):
+        url = reverse("products-web-table")
+        etag = self.client.get(url)["ETag"]
+        product = stock.with_on_hand(Product.objects.all()).get(pk=self.product.pk)
+        key = fragment_key(product, "products/_row.html", "UZS")
+
+        response = self.client.post(
+            reverse("products-web-stock", args=[self.product.pk]),
+            {"kind": StockMovement.Kind.RECEIVE, "quantity": "12"},
+            HTTP_HX_REQUEST="true",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(re.findall(rf'<tr id="product-row-{self.product.pk}"[^>]*hx-swap-oob="true"', response.content.decode())), 1)
+        self.assertContains(response, ">12</p>")
+
+        product = stock.with_on_hand(Product.objects.all()).get(pk=self.product.pk)
+        self.assertNotEqual(fragment_key(product, "products/_row.html", "UZS"), key)
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_invalid_movement_is_rejected(self):
+        url = reverse("products-web-stock", args=[self.product.pk])
+        for data in ({"kind": StockMovement.Kind.SELL, "quantity": "-1"}, {"kind": StockMovement.Kind.ADJUST, "quantity": "0"}):
+            with self.subTest(data=data):
+                response = self.client.post(url, data, HTTP_HX_REQUEST="true")
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    writers = 8
+    movements_per_writer = 25
+
+    def retry_locked(self, write, *args):
+        # SQLite serialises writers by failing them; a real database would make them wait.
+        while True:
+            try:
+                return write(*args)
+            except OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                time.sleep(0.001)
+
+    def test_parallel_writers_lose_no_updates(self):
+        product = Product.objects.create(name="Hot SKU", price=Decimal("1.00"))
+        errors = []
+        start = threading.Barrier(self.writers + 1)
+
+        def writer(index):
+            try:
+                start.wait()
+                for _ in range(self.movements_per_writer):
+                    self.retry_locked(stock.record_movement, product.pk, StockMovement.Kind.RECEIVE, 3)
+                    self.retry_locked(stock.record_movement, product.pk, StockMovement.Kind.SELL, 1)
+                    if index == 0:
+                        # Folding while others write must not drop their deltas either.
+                        self.retry_locked(stock.fold)
+            except Exception as error:  # pragma: no cover - reported below
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        rounds = self.writers * self.movements_per_writer
+        expected = rounds * (3 - 1)
+        self.assertEqual(StockMovement.objects.filter(product=product).count(), rounds * 2)
+        self.assertEqual(stock.on_hand(product.pk), expected)
+        stock.fold()
+        product.refresh_from_db()
+        self.assertEqual(product.stock, expected)
+
+
+class ReadReplicaRoutingTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="replica", password="strong-password")
+        self.client.force_login(user)
+        self.product = Product.objects.create(name="Replicated", price=Decimal("5.00"))
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+    def test_reads_rotate_over_replicas_unless_pinned(self):
+        request = RequestFactory().get("/")
+        request.session = {}
+        self.assertEqual({routing.read_database(request) for _ in range(4)}, {"replica1", "replica2"})
+        request.session[routing.STICKY_SESSION_KEY] = time.time() + 5
+        self.assertEqual(routing.read_database(request), "default")
+        request.session[routing.STICKY_SESSION_KEY] = time.time() - 1
+        self.assertIn(routing.read_database(request), {"replica1", "replica2"})
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_writes_stay_on_the_primary(self):
+        router = routing.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Product, instance=self.product), "default")
+        self.assertIsNone(router.db_for_read(Product))
+        self.assertEqual(routing.primary_for("replica1"), "default")
+        self.assertEqual(routing.primary_for("other"), "other")
+
+    def test_without_replicas_everything_reads_the_primary(self):
+        request = RequestFactory().get("/")
+        request.session = {}
+        self.assertEqual(routing.read_database(request), "default")
+
+    @override_settings(DATABASE_REPLICAS=["default"])
+    def test_session_reads_its_own_writes_from_the_primary(self):
+        with mock.patch.object(routing, "next_replica", wraps=routing.next_replica) as next_replica:
+            self.assertEqual(self.client.get(reverse("products-web-table")).status_code, 200)
+            self.assertEqual(next_replica.call_count, 1)
+
+            response = self.client.post(
+                reverse("products-web-edit", args=[self.product.pk]),
+                {"name": "Renamed", "price": "7.00"},
+                HTTP_HX_REQUEST="true",
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(routing.STICKY_SESSION_KEY, self.client.session)
+            self.assertContains(self.client.get(reverse("products-web-table")), "Renamed")
+            self.assertEqual(next_replica.call_count, 1)
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        results.get_result_cache().clear()
+        self.addCleanup(results.get_result_cache().clear)
+        results.counters.reset()
+        self.addCleanup(results.counters.reset)
+        user = get_user_model().objects.create_user(username="results", password="strong-password")
+        self.client.force_login(user)
+        self.product = Product.objects.create(name="Cached page", price=Decimal("5.00"))
+        self.url = reverse("products-web-table")
+
+    def count_product_selects(self, response_for):
+        with CaptureQueriesContext(connection) as queries:
+            response = response_for()
+        selects = [q for q in queries.captured_queries if 'FROM "products_product"' in q["sql"]]
+        return response, len(selects)
+
+    def test_first_page_is_served_from_cache_until_a_write(self):
+        _, first = self.count_product_selects(lambda: self.client.get(self.url))
+        response, second = self.count_product_selects(lambda: self.client.get(self.url))
+        self.assertGreater(first, 0)
+        self.assertEqual(second, 0)
+        self.assertContains(response, "Cached page")
+        self.assertEqual(results.counters.snapshot()["hits"], 1)
+
+        self.product.name = "Renamed page"
+        self.product.save()
+        self.assertContains(self.client.get(self.url), "Renamed page")
+
+        stock.record_movement(self.product.pk, StockMovement.Kind.RECEIVE, 9)
+        self.assertContains(self.client.get(self.url), ">9</p>")
+        self.assertEqual(results.counters.snapshot(), {"hits": 1, "misses": 3, "hit_rate": 0.25})
+
+    def test_searches_and_sorts_have_their_own_entries(self):
+        Product.objects.create(name="Other item", price=Decimal("9.00"))
+        self.client.get(self.url)
+        response = self.client.get(self.url, {"q": "other"})
+        self.assertContains(response, "Other item")
+        self.assertNotContains(response, "Cached page")
+        self.client.get(self.url, {"q": "other", "sort": "price"})
+        self.assertEqual(results.counters.snapshot()["misses"], 3)
+        self.client.get(self.url, {"q": "  OTHER "})
+        self.assertEqual(results.counters.snapshot()["hits"], 1)
+
+    def test_later_pages_are_not_cached(self):
+        Product.objects.bulk_create(Product(name=f"Bulk {index}", price=Decimal("1.00")) for index in range(20))
+        stats.rebuild()
+        response = self.client.get(self.url)
+        cursor = response.context["page_obj"].next_cursor
+        self.client.get(self.url, {"cursor": cursor})
+        self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(results.counters.snapshot()["misses"], 1)
+        self.assertEqual(results.counters.snapshot()["hits"], 0)
+
+    @override_settings(PRODUCT_RESULT_CACHE=None)
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+        _, selects = self.count_product_selects(lambda: self.client.get(self.url))
+        self.assertGreater(selects, 0)
+        self.assertEqual(results.counters.snapshot()["misses"], 0)
+
+    def test_file_based_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches_setting = {
+            **settings.CACHES,
+            "results": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }
+        with self.settings(CACHES=caches_setting):
+            self.client.get(self.url)
+            response, selects = self.count_product_selects(lambda: self.client.get(self.url))
+        self.assertEqual(selects, 0)
+        self.assertContains(response, "Cached page")
+
+    def test_profiling_view_reports_counters(self):
+        get_user_model().objects.create_user(username="staff", password="strong-password", is_staff=True)
+        self.client.get(self.url)
+        self.client.login(username="staff", password="strong-password")
+        payload = self.client.get(reverse("products-profiling")).json()
+        self.assertEqual(payload["result_cache"]["misses"], 1)
+
+
+class ScalableAdminTests(TestCase):
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser(username="admin", password="strong-password")
+        self.client.force_login(admin_user)
+        Product.objects.bulk_create(
+            Product(name=f"Olma {index}", search_name=f"olma {index}", price=Decimal("1.00")) for index in range(12)
+        )
+        Product.objects.create(name="Nok sharbati", price=Decimal("2.00"))
+        self.url = reverse("admin:products_product_changelist")
+
+    def test_count_is_capped(self):
+        queryset = Product.objects.all()
+        self.assertEqual(estimated_count(queryset, 100), 13)
+        self.assertEqual(estimated_count(queryset, 5), 5)
+        self.assertEqual(estimated_count(queryset.filter(name__startswith="Nok"), 5), 1)
+        with mock.patch.object(EstimatedCountPaginator, "count_cap", 10):
+            self.assertEqual(EstimatedCountPaginator(queryset, 5).num_pages, 2)
+
+    def test_changelist_counts_once_with_a_bounded_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        counts = [query["sql"] for query in queries.captured_queries if "COUNT(" in query["sql"]]
+        self.assertEqual(len(counts), 1)
+        self.assertIn("LIMIT", counts[0])
+
+    def test_search_uses_the_product_search_backend(self):
+        with mock.patch("products.admin.get_search_backend", wraps=get_search_backend) as search:
+            response = self.client.get(self.url, {"q": "sharb"})
+        search.assert_called_once()
+        self.assertContains(response, "Nok sharbati")
+        self.assertNotContains(response, "Olma 1")
+
+    def test_thumbnail_never_uses_the_original(self):
+        product = Product(name="Rasmli", price=Decimal("1.00"), image="products/original.jpg")
+        self.assertEqual(ProductAdmin(Product, admin.site).thumbnail(product), "-")
+
+
+class StreamingUploadHandlerTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(username="uploads", password="strong-password")
+        self.client.force_login(self.user)
+        self.url = reverse("products-web-new")
+
+    def _png(self, size=(40, 30), noise=False):
+        buffer = io.BytesIO()
+        image = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)) if noise else Image.new("RGB", size)
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def post_image(self, content, name="photo.png"):
+        upload = SimpleUploadedFile(name, content, content_type="image/png")
+        return self.client.post(self.url, {"name": "Upload", "price": "10", "image": upload}, HTTP_HX_REQUEST="true")
+
+    def test_sniffs_signatures(self):
+        self.assertEqual(sniff_format(self._png()), "PNG")
+        self.assertEqual(sniff_format(b"\xff\xd8\xff\xe0rest"), "JPEG")
+        self.assertEqual(sniff_format(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "WEBP")
+        self.assertIsNone(sniff_format(b"RIFF\x00\x00\x00\x00WAVEfmt "))
+        self.assertIsNone(sniff_format(b"<svg xmlns="))
+
+    def test_valid_image_passes_through(self):
+        response = self.post_image(self._png())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Product.objects.get(name="Upload").image)
+
+    def test_bytes_that_are_not_an_image_are_rejected(self):
+        response = self.post_image(b"GIF89a" + b"\x00" * 2048)
+        self.assertContains(response, "Faqat jpeg, png, yoki webp rasm yuklang.", status_code=400)
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(PRODUCT_IMAGE_MAX_BYTES=4096)
+    def test_oversized_file_is_dropped_mid_stream(self):
+        content = self._png(size=(50, 50), noise=True)
+        self.assertGreater(len(content), 4096)
+        with mock.patch("django.core.files.uploadhandler.MemoryFileUploadHandler.file_complete") as stored:
+            response = self.post_image(content)
+        self.assertContains(response, "Rasm hajmi", status_code=400)
+        stored.assert_not_called()
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(PRODUCT_IMAGE_MAX_BYTES=1024)
+    def test_oversized_request_skips_the_file(self):
+        with mock.patch("django.core.files.uploadhandler.MemoryFileUploadHandler.file_complete") as stored:
+            response = self.post_image(b"\x00" * (70 * 1024))
+        self.assertContains(response, "So‘rov hajmi", status_code=400)
+        stored.assert_not_called()
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(PRODUCT_IMAGE_MAX_BYTES=1024)
+    def test_oversized_plain_form_post_keeps_its_csrf_token(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        page = client.get(self.url).content.decode()
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+        upload = SimpleUploadedFile("photo.png", b"\x00" * (70 * 1024), content_type="image/png")
+        # A browser sends the token where the form puts it, after the file here.
+        response = client.post(
+            self.url, {"name": "Upload", "price": "10", "image": upload, "csrfmiddlewaretoken": token}
+        )
+        self.assertContains(response, "So‘rov hajmi")
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(PRODUCT_IMAGE_MAX_PIXELS=10_000)
+    def test_pixel_count_is_checked_from_the_header_alone(self):
+        content = self._png(size=(200, 200))
+        with mock.patch.object(Image.Image, "load", side_effect=AssertionError("decoded")):
+            response = self.post_image(content)
+        self.assertContains(response, "Rasm o‘lchami juda katta.", status_code=400)
+
+    def test_truncated_image_is_rejected(self):
+        response = self.post_image(self._png()[:20])
+        self.assertContains(response, "Rasm fayli buzilgan.", status_code=400)
+
+    def test_csrf_is_still_enforced(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(self.url, {"name": "No token", "price": "10"})
+        self.assertEqual(response.status_code, 403)
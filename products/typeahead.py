@@ -0,0 +1,301 @@
+"""In-process prefix index for search-box suggestions.
+
+Every worker keeps its own ``TypeaheadIndex``: a sorted vocabulary of the
+word tokens in ``Product.search_name`` and, per token, the products that
+contain it, ordered by name. A lookup bisects the vocabulary for the prefix
+being typed (or walks the postings of the rarest word already completed) and
+stops as soon as it has ``limit`` matches, without touching the database.
+
+The index loads lazily on first use. ``products.signals`` applies each
+committed save and delete to the local index (``products.bulk`` a whole
+batch at once), so a worker sees its own writes immediately. Writes made by
+other workers are noticed through the catalog version (``products.stats``),
+which every product write bumps by exactly one: a worker that applies its
+own write on top of the version it already had stays current, and one that
+finds the version moved without it syncs. Version checks are throttled to
+one per ``TYPEAHEAD_VERSION_CHECK_SECONDS``.
+
+A sync reads only what changed since the last one: products whose
+``updated_at`` is newer (through ``product_updated_idx``, with
+``TYPEAHEAD_SYNC_MARGIN_SECONDS`` of overlap) and the ids logged in
+``ProductDeletion`` by every delete. Only a worker that fell further behind
+than the log's retention, or a sync of more than ``TYPEAHEAD_MAX_SYNC_ROWS``
+rows, rebuilds the whole index, and it does so without holding the lock
+that lookups take, swapping the new index in when it is done.
+
+Memory is roughly the names themselves plus one list slot per token, i.e.
+a few hundred bytes per product.
+"""
+
+import bisect
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats
+from .models import Product, ProductDeletion
+from .search import normalize_search_text, search_terms
+
+
+def sync_margin() -> timedelta:
+    # Overlap between syncs, for transactions that commit after the row's updated_at and for clock skew.
+    return timedelta(seconds=getattr(settings, "TYPEAHEAD_SYNC_MARGIN_SECONDS", 60))
+
+
+def deletion_retention() -> timedelta:
+    return timedelta(seconds=getattr(settings, "TYPEAHEAD_DELETION_RETENTION_SECONDS", 24 * 60 * 60))
+
+
+def max_sync_rows() -> int:
+    return getattr(settings, "TYPEAHEAD_MAX_SYNC_ROWS", 5000)
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    pk: str
+    name: str
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._loaded = False
+        self.version = None
+        self._synced_at = None
+        self._checked_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._vocabulary = []  # sorted distinct tokens
+        self._postings = {}  # token -> [slot], ordered by _order_key
+        self._entries = []  # slot -> (pk, name, search_name) or None
+        self._slots = {}  # pk -> slot
+        self._free = []
+
+    def _order_key(self, slot):
+        pk, _, search_name = self._entries[slot]
+        return (search_name, pk)
+
+    # Loading and syncing
+
+    def load(self, using: str = "default") -> None:
+        """Rebuild from the database. The new index is built without the lock and swapped in."""
+        synced_at = timezone.now()
+        version = stats.get_version(using=using)
+        # Nothing older is read again: a worker that far behind reloads instead.
+        ProductDeletion.objects.using(using).filter(deleted_at__lt=synced_at - deletion_retention()).delete()
+        entries, slots, postings = [], {}, {}
+        rows = Product.objects.using(using).values_list("pk", "name", "search_name")
+        for pk, name, search_name in rows.iterator(chunk_size=5000):
+            slot = len(entries)
+            entries.append((str(pk), name, search_name))
+            slots[str(pk)] = slot
+            for token in set(search_terms(search_name)):
+                postings.setdefault(token, []).append(slot)
+        # Sorted here rather than with ORDER BY: database collations need
+        # not agree with the Python string order that bisect relies on.
+        for token_postings in postings.values():
+            token_postings.sort(key=lambda slot: (entries[slot][2], entries[slot][0]))
+        vocabulary = sorted(postings)
+        with self._lock:
+            self._vocabulary, self._postings, self._entries, self._slots = vocabulary, postings, entries, slots
+            self._free = []
+            self.version = version
+            self._synced_at = synced_at
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def sync(self, version: int, using: str = "default") -> None:
+        """Apply the saves and deletes committed since the last load or sync."""
+        started = timezone.now()
+        since = self._synced_at - sync_margin()
+        if started - since > deletion_retention():
+            self.load(using)
+            return
+        limit = max_sync_rows()
+        saved = list(Product.objects.using(using).filter(updated_at__gte=since).values_list("pk", "name")[: limit + 1])
+        if len(saved) > limit:
+            # A bulk load: one rebuild beats thousands of single inserts under the lock.
+            self.load(using)
+            return
+        deleted = ProductDeletion.objects.using(using).filter(deleted_at__gte=since).values_list("product_id", flat=True)
+        changes = [(pk, None) for pk in deleted] + saved
+        with self._lock:
+            self._apply(changes)
+            self.version = version
+            self._synced_at = started
+
+    def ensure_current(self, using: str = "default") -> None:
+        if not self._loaded:
+            with self._sync_lock:
+                if not self._loaded:
+                    self.load(using)
+            return
+        interval = getattr(settings, "TYPEAHEAD_VERSION_CHECK_SECONDS", 1.0)
+        with self._lock:
+            if time.monotonic() - self._checked_at < interval:
+                return
+            self._checked_at = time.monotonic()
+        # Lookups keep using the current index while one thread catches it up.
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            version = stats.get_version(using=using)
+            if version != self.version:
+                self.sync(version, using)
+        finally:
+            self._sync_lock.release()
+
+    def apply(self, pk, name: str | None, version: int) -> None:
+        """Apply a committed write (``name=None`` for a delete) made at ``version``."""
+        self.apply_many([(pk, name)], version)
+
+    def apply_many(self, changes, version: int) -> None:
+        """Apply ``(pk, name)`` changes that were committed together as one version step."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._apply(changes)
+            if self.version == version - 1:
+                self.version = version
+            # Otherwise another process wrote in between; the next version
+            # check will see the mismatch and sync.
+
+    def _apply(self, changes) -> None:
+        for pk, name in changes:
+            self._remove(str(pk))
+            if name is not None:
+                self._add(str(pk), name)
+
+    def _add(self, pk: str, name: str) -> None:
+        search_name = normalize_search_text(name)
+        entry = (pk, name, search_name)
+        if self._free:
+            slot = self._free.pop()
+            self._entries[slot] = entry
+        else:
+            slot = len(self._entries)
+            self._entries.append(entry)
+        self._slots[pk] = slot
+        for token in set(search_terms(search_name)):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = []
+                bisect.insort(self._vocabulary, token)
+            bisect.insort(postings, slot, key=self._order_key)
+
+    def _remove(self, pk: str) -> None:
+        slot = self._slots.pop(pk, None)
+        if slot is None:
+            return
+        key = self._order_key(slot)
+        for token in set(search_terms(key[0])):
+            postings = self._postings[token]
+            position = bisect.bisect_left(postings, key, key=self._order_key)
+            del postings[position]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        self._entries[slot] = None
+        self._free.append(slot)
+
+    # Lookups
+
+    def suggest(self, query: str, limit: int = 8) -> list[Suggestion]:
+        """Products with a word starting with each query word, at most ``limit``.
+
+        The last word is a prefix that is still being typed. With a single
+        word, matches come in token then name order; with several, the words
+        before the last must be complete, and whichever of them (or the
+        prefix) has the fewest postings drives the scan.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            if len(terms) == 1:
+                return self._suggest_prefix(terms[0], limit)
+            # One lookahead per word: "some word of the name starts with it".
+            matcher = re.compile("".join(rf"(?=.*\b{re.escape(term)})" for term in terms))
+            driver = min((self._postings.get(term, ()) for term in terms[:-1]), key=len)
+            prefix_tokens = self._prefix_tokens(terms[-1])
+            if sum(len(self._postings[token]) for token in prefix_tokens) < len(driver):
+                driver = (slot for token in prefix_tokens for slot in self._postings[token])
+            results = []
+            seen = set()
+            for slot in driver:
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                pk, name, search_name = self._entries[slot]
+                if matcher.match(search_name):
+                    results.append(Suggestion(pk, name))
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def _prefix_tokens(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff", lo=start)
+        return self._vocabulary[start:end]
+
+    def _suggest_prefix(self, prefix: str, limit: int) -> list[Suggestion]:
+        results = []
+        seen = set()
+        for token in self._prefix_tokens(prefix):
+            for slot in self._postings[token]:
+                if slot not in seen:
+                    seen.add(slot)
+                    pk, name, _ = self._entries[slot]
+                    results.append(Suggestion(pk, name))
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def invalidate(self) -> None:
+        """Drop everything; the next lookup reloads from the database."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+            self.version = None
+            self._synced_at = None
+
+    def __len__(self):
+        return len(self._slots)
+
+
+_index = TypeaheadIndex()
+
+
+def get_index(using: str = "default") -> TypeaheadIndex:
+    _index.ensure_current(using)
+    return _index
+
+
+def record_write(pk, name: str | None, using: str = "default") -> None:
+    """Called from a signal inside the write's transaction, after the stats update."""
+    record_writes([(pk, name)], using=using)
+
+
+def record_writes(changes, using: str = "default") -> None:
+    """Like ``record_write`` for a batch that bumped the catalog version once."""
+    changes = list(changes)
+    deleted = [ProductDeletion(product_id=pk) for pk, name in changes if name is None]
+    if deleted:
+        # Other workers sync deletes from this log.
+        ProductDeletion.objects.using(using).bulk_create(deleted)
+    if not _index.loaded:
+        return
+    version = stats.get_version(using=using)
+    transaction.on_commit(lambda: _index.apply_many(changes, version), using=using)
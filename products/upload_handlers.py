@@ -0,0 +1,115 @@
+"""Reject bad product images while they are still arriving.
+
+``ImageUploadHandler`` runs ahead of Django's memory and temporary-file
+handlers on the product create and edit views. It watches every file in the
+request as it streams in:
+
+* in a request declaring more bytes than the largest valid image plus the
+  rest of the form, every file is skipped as it starts, so none of it is
+  stored while the remaining fields are still parsed;
+* a file that grows past ``PRODUCT_IMAGE_MAX_BYTES`` is dropped at the chunk
+  that crosses the limit;
+* the first bytes must carry a JPEG, PNG or WebP signature, whatever the
+  client claimed in ``Content-Type``;
+* Pillow then parses only the header (``Image.open`` is lazy and nothing is
+  decoded) to confirm the format and read the dimensions, and images over
+  ``PRODUCT_IMAGE_MAX_PIXELS`` are refused, which stops decompression bombs
+  before any pixel data is expanded.
+
+Dropped files are skipped rather than failing the whole request: the reason
+is kept in ``request.upload_errors`` and ``ProductForm`` reports it as a
+normal field error. The downstream handlers never hold more than the few
+chunks read before the header was checked.
+"""
+
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image, UnidentifiedImageError
+
+SIGNATURES = {
+    "JPEG": (b"\xff\xd8\xff",),
+    "PNG": (b"\x89PNG\r\n\x1a\n",),
+    "WEBP": (b"RIFF",),
+}
+# Enough for any sane header; JPEGs may carry EXIF blocks before the frame size.
+MAX_HEADER_BYTES = 256 * 1024
+# Room for the form's other fields and the multipart framing.
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+def max_image_bytes() -> int:
+    return getattr(settings, "PRODUCT_IMAGE_MAX_BYTES", 5 * 1024 * 1024)
+
+
+def max_image_pixels() -> int:
+    return getattr(settings, "PRODUCT_IMAGE_MAX_PIXELS", 25_000_000)
+
+
+def sniff_format(head: bytes) -> str | None:
+    for image_format, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            if image_format == "WEBP" and head[8:12] != b"WEBP":
+                return None
+            return image_format
+    return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request.upload_errors = {}
+        self.request_too_large = content_length > max_image_bytes() + FORM_OVERHEAD_BYTES
+
+    def new_file(self, field_name, *args, **kwargs):
+        if self.request_too_large:
+            # Nothing legitimate is this big: drop the file without storing a byte of it. Parsing
+            # carries on so fields after it (a plain form's CSRF token) still arrive.
+            limit_mb = max_image_bytes() // (1024 * 1024)
+            self.request.upload_errors[field_name] = f"So‘rov hajmi {limit_mb}MB dan oshmasligi kerak."
+            raise SkipFile()
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.head = b""
+        self.checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > max_image_bytes():
+            self.reject(f"Rasm hajmi {max_image_bytes() // (1024 * 1024)}MB dan oshmasligi kerak.")
+        if not self.checked:
+            self.head += raw_data
+            self.checked = self.check_header()
+        return raw_data
+
+    def check_header(self) -> bool:
+        """True once the header is valid; False while more bytes are needed."""
+        image_format = sniff_format(self.head)
+        if image_format is None:
+            if len(self.head) < 12:
+                return False
+            self.reject("Faqat jpeg, png, yoki webp rasm yuklang.")
+        try:
+            # Reads the header only; pixel data is never decoded here.
+            with Image.open(io.BytesIO(self.head), formats=[image_format]) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject("Rasm o‘lchami juda katta.")
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            if len(self.head) < MAX_HEADER_BYTES:
+                return False
+            self.reject("Rasm fayli buzilgan.")
+        if width * height > max_image_pixels():
+            self.reject("Rasm o‘lchami juda katta.")
+        return True
+
+    def reject(self, message: str):
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            # The whole file was shorter than a readable header.
+            self.request.upload_errors[self.field_name] = "Rasm fayli buzilgan."
+        # The next handler builds the UploadedFile.
+        return None
@@ -0,0 +1,145 @@
+"""Background image uploads.
+
+With ``PRODUCT_IMAGE_UPLOAD_MODE = "async"`` a submitted image is written to a
+local spool directory and the product row is committed with
+``image_state = "pending"``. Once the transaction commits, a bounded thread
+pool pushes the spooled file to the product's storage (R2 in production;
+skipped when ``products.blobs`` already holds the same bytes),
+builds the resized variants from the local copy, and saves the product as
+``ready``. Failed attempts are retried with exponential backoff; a product
+whose image never made it is left ``failed`` with its spool file kept for
+inspection.
+
+``PRODUCT_IMAGE_UPLOAD_WORKERS = 0`` runs the upload inline at commit time,
+which is what the tests use.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import blobs, stats
+
+logger = logging.getLogger(__name__)
+
+
+def is_async_upload_enabled() -> bool:
+    return getattr(settings, "PRODUCT_IMAGE_UPLOAD_MODE", "sync") == "async"
+
+
+def get_spool_storage() -> FileSystemStorage:
+    return FileSystemStorage(location=settings.PRODUCT_IMAGE_SPOOL_ROOT)
+
+
+class UploadQueue:
+    """A thread pool that refuses to hold more than ``max_pending`` jobs."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._executor = None
+        if workers:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-upload")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, func, *args) -> None:
+        if self._executor is None or not self._slots.acquire(blocking=False):
+            # Inline mode, or the pool is saturated: apply backpressure on the caller.
+            func(*args)
+            return
+        future = self._executor.submit(self._run, func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _run(self, func, *args) -> None:
+        close_old_connections()
+        try:
+            func(*args)
+        finally:
+            close_old_connections()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_upload_queue() -> UploadQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue(
+                workers=getattr(settings, "PRODUCT_IMAGE_UPLOAD_WORKERS", 4),
+                max_pending=getattr(settings, "PRODUCT_IMAGE_UPLOAD_MAX_PENDING", 64),
+            )
+        return _queue
+
+
+def spool_image(uploaded_file) -> str:
+    return get_spool_storage().save(uploaded_file.name, uploaded_file)
+
+
+def schedule_image_upload(product, using: str = "default") -> None:
+    product_pk, spool_name = product.pk, product.image_spool
+    transaction.on_commit(
+        lambda: get_upload_queue().submit(upload_spooled_image, product_pk, spool_name, using),
+        using=using,
+    )
+
+
+def upload_spooled_image(product_pk, spool_name: str, using: str = "default") -> None:
+    from .models import Product
+
+    retries = getattr(settings, "PRODUCT_IMAGE_UPLOAD_RETRIES", 3)
+    backoff = getattr(settings, "PRODUCT_IMAGE_UPLOAD_BACKOFF", 0.5)
+    spool = get_spool_storage()
+    for attempt in range(1, retries + 1):
+        try:
+            product = Product.objects.using(using).get(pk=product_pk)
+        except Product.DoesNotExist:
+            spool.delete(spool_name)
+            return
+        if product.image_spool != spool_name:
+            # A newer upload replaced this one while it waited in the queue.
+            spool.delete(spool_name)
+            return
+        try:
+            _publish(product, spool, spool_name, using)
+        except Exception:
+            logger.warning(
+                "Image upload for product %s failed (attempt %s/%s).",
+                product_pk, attempt, retries, exc_info=True,
+            )
+            if attempt < retries:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            continue
+        spool.delete(spool_name)
+        return
+    with transaction.atomic(using=using):
+        # updated_at keys the cached row fragments; without it the pending (polling) row is served forever.
+        failed = Product.objects.using(using).filter(pk=product_pk, image_spool=spool_name).update(
+            image_state=Product.ImageState.FAILED, updated_at=timezone.now()
+        )
+        if failed:
+            stats.bump_version(using=using)
+
+
+def _publish(product, spool, spool_name: str, using: str) -> None:
+    previous = product.image_variants
+    with spool.open(spool_name, "rb") as handle:
+        # Content-addressed: nothing is sent to the storage if the same image is already there.
+        product.image.save(spool_name.rsplit("/", 1)[-1], File(handle), save=False)
+        product.image_variants = blobs.get_variants(product.image, using=using, source=handle)
+    product.image_state = product.ImageState.READY
+    product.image_spool = ""
+    product.save(
+        using=using,
+        update_fields=["image", "image_variants", "image_state", "image_spool", "updated_at"],
+    )
+    source = previous.get("source", "")
+    if previous and not blobs.is_blob_name(source):
+        blobs.release(product.image.storage, [(source, previous)], using=using)
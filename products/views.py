@@ -1,21 +1,44 @@
+import asyncio
+import csv
+import functools
+import hashlib
 import json
+import zlib
 
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.generic import CreateView, ListView, TemplateView, UpdateView
 
-from .forms import ProductForm
+from .forms import ProductBulkActionForm, ProductForm, StockMovementForm
 from .models import Product
-
-
+from . import events, profiling, results, routing, stats, stock, typeahead
+from .fragments import default_currency, render_product_fragments
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import get_search_backend, normalize_search_text
+from .upload_handlers import ImageUploadHandler
 
 
 class ProductQueryMixin:
+    etag_name = ""
+    # Views that only read the catalog may be served from a replica (see products.routing).
+    read_from_replica = False
+    sort_orderings = {
+        "created": ("-created_at", "id"),
+        "price": ("-price", "-created_at", "id"),
+        "relevance": ("-search_rank", "-created_at", "id"),
+    }
+
     def get_currency(self) -> str:
         return getattr(settings, "INVENTORY_CURRENCY", "UZS")
 
@@ -24,61 +47,282 @@ class ProductQueryMixin:
 
     def get_sort_key(self) -> str:
         value = self.request.GET.get("sort", "created")
-        return value if value in {"price", "created"} else "created"
+        if value == "relevance" and not self.get_search_query():
+            return "created"
+        return value if value in self.sort_orderings else "created"
+
+    def get_sort_ordering(self):
+        return self.sort_orderings[self.get_sort_key()]
+
+    def get_stock_filter(self) -> str:
+        return "low" if self.request.GET.get("stock") == "low" else ""
+
+    def is_filtered(self) -> bool:
+        return bool(self.get_search_query() or self.get_stock_filter())
 
     def filter_queryset(self, queryset):
         query = self.get_search_query()
         if query:
-            queryset = queryset.filter(name__icontains=query)
-        sort_key = self.get_sort_key()
-        if sort_key == "price":
-            queryset = queryset.order_by("-price", "-created_at")
-        else:
-            queryset = queryset.order_by("-created_at")
-        return queryset
+            backend = get_search_backend(queryset.model, queryset.db)
+            queryset = backend.filter(queryset, query)
+            if self.get_sort_key() == "relevance":
+                queryset = backend.annotate_rank(queryset, query)
+        queryset = stock.with_on_hand(queryset)
+        if self.get_stock_filter() == "low":
+            queryset = stock.filter_low_stock(queryset)
+        return queryset.order_by(*self.get_sort_ordering())
+
+    def get_read_database(self) -> str:
+        """The alias every query of this response runs on, chosen once per request."""
+        if not hasattr(self, "_read_database"):
+            self._read_database = routing.read_database(self.request) if self.read_from_replica else DEFAULT_DB_ALIAS
+        return self._read_database
+
+    async def aget_read_database(self) -> str:
+        if not hasattr(self, "_read_database"):
+            self._read_database = (
+                await routing.aread_database(self.request) if self.read_from_replica else DEFAULT_DB_ALIAS
+            )
+        return self._read_database
+
+    def get_cursor(self) -> str:
+        return self.request.GET.get("cursor", "").strip()
+
+    def get_etag(self, version: int, ledger: int, *extra) -> str:
+        """Validator for everything the response is rendered from.
+
+        ``version`` is the catalog version, which moves on every product
+        write, and ``ledger`` the stock ledger position, which moves on every
+        stock movement; the local date is included because rows print
+        "Bugun"/"Kecha".
+        """
+        parts = [
+            self.etag_name,
+            version,
+            ledger,
+            normalize_search_text(self.get_search_query()),
+            self.get_sort_key(),
+            self.get_stock_filter(),
+            self.get_cursor(),
+            self.request.GET.get("view", ""),
+            # Which parameters are present at all picks the partial template.
+            sorted(self.request.GET),
+            self.get_currency(),
+            timezone.localdate().isoformat(),
+            *extra,
+        ]
+        digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def conditional_get(self, request, get_response, *etag_parts):
+        using = self.get_read_database()
+        version, newest = stats.get_validator(using=using)
+        self.catalog_state = (version, stock.ledger_position(using=using), newest)
+        etag = self.get_etag(*self.catalog_state, *etag_parts)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = get_response()
+            response.headers["ETag"] = etag
+        return self.patch_revalidation(response)
+
+    async def aconditional_get(self, request, get_response, *etag_parts):
+        using = await self.aget_read_database()
+        version, newest = await stats.aget_validator(using=using)
+        self.catalog_state = (version, await stock.aledger_position(using=using), newest)
+        etag = self.get_etag(*self.catalog_state, *etag_parts)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await get_response()
+            response.headers["ETag"] = etag
+        return self.patch_revalidation(response)
+
+    def patch_revalidation(self, response):
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Cookie", "HX-Request"])
+        return response
+
+    def get_result_key(self, kind: str, *extra):
+        """Cache key for a first-page result (see ``products.results``), or None if it is not cached."""
+        if self.get_cursor() or not hasattr(self, "catalog_state"):
+            return None
+        return results.result_key(
+            kind,
+            self.get_read_database(),
+            *self.catalog_state,
+            normalize_search_text(self.get_search_query()),
+            self.get_sort_key(),
+            self.get_stock_filter(),
+            *extra,
+        )
+
+    def paginate_keyset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_sort_ordering())
+        key = self.get_result_key("page", page_size)
+        try:
+            if key is None:
+                return paginator, paginator.page(self.get_cursor())
+            return paginator, results.get_or_compute(key, paginator.page)
+        except InvalidCursor:
+            raise Http404("Noto‘g‘ri sahifa kursori.")
+
+    async def apaginate_keyset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_sort_ordering())
+        key = self.get_result_key("page", page_size)
+        try:
+            if key is None:
+                return paginator, await paginator.apage(self.get_cursor())
+            return paginator, await results.aget_or_compute(key, paginator.apage)
+        except InvalidCursor:
+            raise Http404("Noto‘g‘ri sahifa kursori.")
+
+    def get_table_template_names(self):
+        is_paginating = "cursor" in self.request.GET
+        is_search = "q" in self.request.GET or "sort" in self.request.GET
+
+        if not is_paginating and is_search:
+            # For a search, we render the OOB template which updates both views
+            return ["products/_product_list_oob.html"]
+
+        if self.request.GET.get("view") == "cards":
+            if is_paginating:
+                return ["products/_product_cards.html"]
+            return ["products/_cards_mobile.html"]
+        
+        if is_paginating:
+            return ["products/_product_rows.html"]
+        return ["products/_table.html"]
 
+    def mark_last_page(self, response, page_obj):
+        if not page_obj.has_next():
+            response["HX-Trigger"] = json.dumps({"stopInfiniteScroll": True})
+        return response
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """``LoginRequiredMixin`` for async views: the user is loaded with ``auser()``.
+
+    The resolved user is stored on ``request.user`` so templates and context
+    processors never trigger a synchronous session lookup.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
 
-from django.core.paginator import Paginator
 
 class ProductListView(ProductQueryMixin, LoginRequiredMixin, TemplateView):
     template_name = "products/list.html"
+    read_from_replica = True
     paginate_by = 15
+    etag_name = "products-list"
+
+    def get_stats(self, queryset):
+        if not self.is_filtered():
+            return catalog_summary(using=queryset.db)
+        return results.get_or_compute(
+            self.get_result_key("stats"),
+            lambda: {
+                "total": queryset.count(),
+                "last_product": queryset.order_by("-created_at").first(),
+            },
+        )
+
+    def get(self, request, *args, **kwargs):
+        # The full page embeds the user and their CSRF secret, so both are part of the validator.
+        return self.conditional_get(
+            request,
+            functools.partial(super().get, request, *args, **kwargs),
+            request.user.pk,
+            request.META.get("CSRF_COOKIE", ""),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Get initial queryset
-        queryset = Product.objects.all()
+        queryset = Product.objects.using(self.get_read_database())
         queryset = self.filter_queryset(queryset)
         
         # Paginate the queryset
-        paginator = Paginator(queryset, self.paginate_by)
-        page_number = self.request.GET.get("page", 1)
-        page_obj = paginator.get_page(page_number)
-
-        # Get stats
-        total = queryset.count()
-        last_product = queryset.order_by("-created_at").first()
-        stats = {
-            "total": total,
-            "last_product": last_product,
-        }
+        paginator, page_obj = self.paginate_keyset(queryset, self.paginate_by)
 
+        context["stats"] = self.get_stats(queryset)
         context.update(
             {
                 "page_title": "Mahsulotlar",
-                "stats": stats,
                 "products": page_obj.object_list,
                 "page_obj": page_obj,
                 "search_query": self.get_search_query(),
                 "sort": self.get_sort_key(),
+                "stock_filter": self.get_stock_filter(),
                 "currency": self.get_currency(),
             }
         )
         return context
 
 
-class HTMXFormMixin:
+def catalog_summary(using: str = "default") -> dict:
+    summary = stats.get_stats(using=using)
+    return {"total": summary.total, "last_product": summary.newest_product}
+
+
+class ProductOOBMixin:
+    """Answer an HTMX write with out-of-band swaps for what it changed.
+
+    Instead of making the page reload its first page of rows, the response
+    carries the new or updated row and card (or a removal for a delete) and
+    the refreshed stats block; ``HX-Reswap: none`` leaves the modal alone
+    until ``closeModal`` fires.
+
+    The modal forms send along the list's ``q``, ``sort`` and ``stock``. A
+    new product is only inserted at the top of the unfiltered, newest-first
+    list; any other view reloads its table instead. A filtered view keeps
+    its own summary rather than the whole catalog's stats.
+    """
+
+    oob_template_name = "products/_product_oob.html"
+
+    def get_list_view(self) -> tuple[str, str, str]:
+        """``(q, sort, stock)`` of the list the write was made from."""
+        data = self.request.POST
+        return data.get("q", "").strip(), data.get("sort", "created"), data.get("stock", "")
+
+    def render_oob_response(self, message, product=None, created=False, deleted_pk=None):
+        if product is not None:
+            product.on_hand = stock.on_hand(product.pk)
+        query, sort, stock_filter = self.get_list_view()
+        filtered = bool(query) or stock_filter == "low"
+        # Relevance without a query and unknown sorts fall back to newest first.
+        newest_first = sort not in ProductQueryMixin.sort_orderings or sort in ("created", "relevance")
+        insert_created = created and not filtered and newest_first
+        context = {
+            "product": product,
+            "created": created,
+            "insert_created": insert_created,
+            "deleted_pk": deleted_pk,
+            "currency": default_currency(),
+            "stats": None if filtered else catalog_summary(),
+        }
+        html = render_to_string(self.oob_template_name, context, request=self.request)
+        triggers = {
+            "showToast": {
+                "type": "success",
+                "message": message,
+            },
+        }
+        if created and not insert_created:
+            triggers["reloadProducts"] = True
+        headers = {
+            "HX-Reswap": "none",
+            "HX-Trigger": json.dumps(triggers),
+            "HX-Trigger-After-Settle": json.dumps({"closeModal": True}),
+        }
+        return HttpResponse(html, headers=headers)
+
+
+class HTMXFormMixin(ProductOOBMixin):
     htmx_template_name = None
     success_message = "Mahsulot saqlandi"
     error_message = "Xatolik yuz berdi. Qayta urinib ko‘ring."
@@ -90,7 +334,7 @@ class HTMXFormMixin:
         context["product"] = getattr(self, "object", None)
         context["is_htmx"] = bool(self.request.headers.get("HX-Request"))
         obj = context["product"]
-        context["image_preview"] = obj.image.url if obj and obj.image else ""
+        context["image_preview"] = obj.card_image_url if obj and obj.image else ""
         return context
 
     def render_to_response(self, context, **response_kwargs):
@@ -118,32 +362,40 @@ class HTMXFormMixin:
         return super().form_invalid(form)
 
     def form_valid(self, form):
+        created = getattr(self, "object", None) is None
         self.object = form.save()
         if self.request.headers.get("HX-Request"):
-            headers = {
-                "HX-Trigger": json.dumps(
-                    {
-                        "reloadProducts": True,
-                        "showToast": {
-                            "type": "success",
-                            "message": self.success_message,
-                        },
-                    }
-                ),
-                "HX-Trigger-After-Settle": json.dumps({"closeModal": True}),
-            }
-            return HttpResponse(status=204, headers=headers)
+            return self.render_oob_response(self.success_message, product=self.object, created=created)
         return super().form_valid(form)
 
 
-class ProductCreateView(LoginRequiredMixin, HTMXFormMixin, CreateView):
+@method_decorator(csrf_exempt, name="dispatch")
+class ImageUploadMixin:
+    """Validate image uploads while they stream in (see ``products.upload_handlers``).
+
+    Upload handlers can only be changed before the body is read, and
+    ``CsrfViewMiddleware`` reads it to find the token, so the middleware is
+    skipped and the same check runs here once the handler is in place.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["upload_errors"] = getattr(self.request, "upload_errors", None)
+        return kwargs
+
+
+class ProductCreateView(ImageUploadMixin, LoginRequiredMixin, HTMXFormMixin, CreateView):
     form_class = ProductForm
     template_name = "products/create_modal.html"
     htmx_template_name = "products/create_modal.html"
     success_url = reverse_lazy("products-web-list")
 
 
-class ProductUpdateView(LoginRequiredMixin, HTMXFormMixin, UpdateView):
+class ProductUpdateView(ImageUploadMixin, LoginRequiredMixin, HTMXFormMixin, UpdateView):
     model = Product
     form_class = ProductForm
     template_name = "products/edit_modal.html"
@@ -153,48 +405,237 @@ class ProductUpdateView(LoginRequiredMixin, HTMXFormMixin, UpdateView):
 
 class ProductTablePartialView(ProductQueryMixin, LoginRequiredMixin, ListView):
     model = Product
+    read_from_replica = True
     context_object_name = "products"
     paginate_by = 15
+    etag_name = "products-table"
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().using(self.get_read_database())
         return self.filter_queryset(queryset)
 
-    def get_template_names(self):
-        is_paginating = "page" in self.request.GET
-        is_search = "q" in self.request.GET or "sort" in self.request.GET
+    def get(self, request, *args, **kwargs):
+        return self.conditional_get(request, functools.partial(super().get, request, *args, **kwargs))
 
-        if not is_paginating and is_search:
-            # For a search, we render the OOB template which updates both views
-            return ["products/_product_list_oob.html"]
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = self.paginate_keyset(queryset, page_size)
+        return paginator, page, page.object_list, page.has_next()
 
-        if self.request.GET.get("view") == "cards":
-            if is_paginating:
-                return ["products/_product_cards.html"]
-            return ["products/_cards_mobile.html"]
-        
-        if is_paginating:
-            return ["products/_product_rows.html"]
-        return ["products/_table.html"]
+    def get_template_names(self):
+        return self.get_table_template_names()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["currency"] = self.get_currency()
         context["search_query"] = self.get_search_query()
         context["sort"] = self.get_sort_key()
+        context["stock_filter"] = self.get_stock_filter()
         context["view"] = self.request.GET.get("view")
         return context
 
     def render_to_response(self, context, **response_kwargs):
         response = super().render_to_response(context, **response_kwargs)
-        if not context["page_obj"].has_next():
-            response["HX-Trigger"] = json.dumps({"stopInfiniteScroll": True})
+        return self.mark_last_page(response, context["page_obj"])
+
+
+class AsyncProductListView(AsyncLoginRequiredMixin, ProductQueryMixin, View):
+    """Native async ``ProductListView`` for ASGI deployments (``INVENTORY_ASYNC_VIEWS``)."""
+
+    template_name = ProductListView.template_name
+    read_from_replica = True
+    paginate_by = ProductListView.paginate_by
+    etag_name = ProductListView.etag_name
+
+    async def get(self, request, *args, **kwargs):
+        return await self.aconditional_get(
+            request, self.render_page, request.user.pk, request.META.get("CSRF_COOKIE", "")
+        )
+
+    async def get_stats(self, queryset):
+        if not self.is_filtered():
+            summary = await stats.aget_stats(using=queryset.db)
+            return {"total": summary.total, "last_product": summary.newest_product}
+
+        async def compute():
+            return {
+                "total": await queryset.acount(),
+                "last_product": await queryset.order_by("-created_at").afirst(),
+            }
+
+        return await results.aget_or_compute(self.get_result_key("stats"), compute)
+
+    async def render_page(self):
+        queryset = self.filter_queryset(Product.objects.using(await self.aget_read_database()))
+        paginator, page_obj = await self.apaginate_keyset(queryset, self.paginate_by)
+        context = {
+            "view": self,
+            "stats": await self.get_stats(queryset),
+            "page_title": "Mahsulotlar",
+            "products": page_obj.object_list,
+            "page_obj": page_obj,
+            "search_query": self.get_search_query(),
+            "sort": self.get_sort_key(),
+            "stock_filter": self.get_stock_filter(),
+            "currency": self.get_currency(),
+        }
+        return HttpResponse(render_to_string(self.template_name, context, request=self.request))
+
+
+class AsyncProductTablePartialView(AsyncLoginRequiredMixin, ProductQueryMixin, View):
+    """Native async ``ProductTablePartialView`` for ASGI deployments (``INVENTORY_ASYNC_VIEWS``)."""
+
+    paginate_by = ProductTablePartialView.paginate_by
+    read_from_replica = True
+    etag_name = ProductTablePartialView.etag_name
+
+    async def get(self, request, *args, **kwargs):
+        return await self.aconditional_get(request, self.render_page)
+
+    async def render_page(self):
+        queryset = self.filter_queryset(Product.objects.using(await self.aget_read_database()))
+        paginator, page_obj = await self.apaginate_keyset(queryset, self.paginate_by)
+        context = {
+            "paginator": paginator,
+            "page_obj": page_obj,
+            "is_paginated": page_obj.has_next(),
+            "object_list": page_obj.object_list,
+            "products": page_obj.object_list,
+            "currency": self.get_currency(),
+            "search_query": self.get_search_query(),
+            "sort": self.get_sort_key(),
+            "stock_filter": self.get_stock_filter(),
+            "view": self.request.GET.get("view"),
+        }
+        html = render_to_string(self.get_table_template_names(), context, request=self.request)
+        return self.mark_last_page(HttpResponse(html), page_obj)
+
+
+class ProductRowPartialView(ProductQueryMixin, LoginRequiredMixin, View):
+    """A single table row (or card with ``?view=cards``), polled while its image uploads."""
+
+    def get(self, request, *args, **kwargs):
+        product = get_object_or_404(stock.with_on_hand(Product.objects.all()), pk=kwargs["pk"])
+        template_name = "products/_card.html" if request.GET.get("view") == "cards" else "products/_row.html"
+        return HttpResponse(render_product_fragments([product], template_name, self.get_currency()))
+
+
+class ProductEventStreamView(AsyncLoginRequiredMixin, View):
+    """Server-Sent Events feed of catalog changes (see ``products.events``)."""
+
+    retry_ms = 3000
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            # WSGI would buffer an endless stream; 204 tells EventSource not to reconnect.
+            return HttpResponse(status=204)
+        response = StreamingHttpResponse(self.stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Keep nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
         return response
 
+    async def stream(self):
+        backend = events.get_backend()
+        subscription = backend.subscribe()
+        keepalive = getattr(settings, "PRODUCT_EVENTS_KEEPALIVE_SECONDS", 15)
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.to_sse()
+        finally:
+            backend.unsubscribe(subscription)
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
 
 
+class ProductAutocompleteView(LoginRequiredMixin, View):
+    """Name suggestions for the search box, served from the in-process typeahead index."""
 
-class ProductDeleteView(LoginRequiredMixin, View):
+    template_name = "products/_autocomplete.html"
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get("q", "").strip()
+        limit = getattr(settings, "TYPEAHEAD_LIMIT", 8)
+        suggestions = typeahead.get_index().suggest(query, limit) if query else []
+        html = render_to_string(self.template_name, {"suggestions": suggestions, "query": query}, request=request)
+        return HttpResponse(html)
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back for streaming."""
+
+    def write(self, value):
+        return value
+
+
+class ProductExportView(ProductQueryMixin, LoginRequiredMixin, View):
+    """Stream the filtered catalog as CSV or JSON Lines, optionally gzipped.
+
+    Rows are read with ``values_list().iterator()`` so no model instances are
+    built and only ``chunk_size`` rows are held at a time.
+    """
+
+    fields = ("id", "name", "price", "created_at", "updated_at")
+    read_from_replica = True
+    chunk_size = 2000
+    content_types = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in self.content_types:
+            export_format = "csv"
+        compress = request.GET.get("compress") == "gzip"
+
+        rows = self.filter_queryset(Product.objects.using(self.get_read_database())).values_list(*self.fields)
+        chunks = self.render_chunks(rows.iterator(chunk_size=self.chunk_size), export_format)
+        if compress:
+            chunks = self.gzip_chunks(chunks)
+
+        filename = f"products-{timezone.localdate():%Y%m%d}.{export_format}"
+        content_type = self.content_types[export_format]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def render_chunks(self, rows, export_format: str):
+        writer = csv.writer(_Echo())
+        if export_format == "csv":
+            yield writer.writerow(self.fields)
+        buffer = []
+        for row in rows:
+            if export_format == "csv":
+                buffer.append(writer.writerow(row))
+            else:
+                record = dict(zip(self.fields, row))
+                buffer.append(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+            if len(buffer) >= self.chunk_size:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+
+    def gzip_chunks(self, chunks):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8"))
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class ProductDeleteView(LoginRequiredMixin, ProductOOBMixin, View):
     template_name = "products/delete_modal.html"
 
     def get_object(self):
@@ -210,19 +651,89 @@ class ProductDeleteView(LoginRequiredMixin, View):
 
     def post(self, request, *args, **kwargs):
         product = self.get_object()
+        pk = product.pk
         product.delete()
         if request.headers.get("HX-Request"):
-            headers = {
-                "HX-Trigger": json.dumps(
-                    {
-                        "reloadProducts": True,
-                        "showToast": {
-                            "type": "success",
-                            "message": "Mahsulot o‘chirildi",
-                        },
-                    }
-                ),
-                "HX-Trigger-After-Settle": json.dumps({"closeModal": True}),
-            }
-            return HttpResponse(status=204, headers=headers)
+            return self.render_oob_response("Mahsulot o‘chirildi", deleted_pk=pk)
+        return HttpResponse(status=204)
+
+
+class ProductStockView(LoginRequiredMixin, ProductOOBMixin, View):
+    """Record a receipt, sale or adjustment from the row's stock modal."""
+
+    form_class = StockMovementForm
+    template_name = "products/stock_modal.html"
+
+    def get_object(self):
+        return get_object_or_404(stock.with_on_hand(Product.objects.all()), pk=self.kwargs["pk"])
+
+    def render_form(self, product, form, status=200):
+        context = {"product": product, "form": form, "form_action": self.request.path}
+        return HttpResponse(render_to_string(self.template_name, context, request=self.request), status=status)
+
+    def get(self, request, *args, **kwargs):
+        return self.render_form(self.get_object(), self.form_class())
+
+    def post(self, request, *args, **kwargs):
+        product = self.get_object()
+        form = self.form_class(request.POST)
+        if not form.is_valid():
+            response = self.render_form(product, form, status=400)
+            response["HX-Trigger"] = json.dumps(
+                {"showToast": {"type": "error", "message": "Xatolik yuz berdi. Qayta urinib ko‘ring."}}
+            )
+            return response
+        form.save(product)
+        if request.headers.get("HX-Request"):
+            return self.render_oob_response("Zaxira yangilandi", product=product)
+        return HttpResponse(status=204)
+
+
+class ProductBulkActionView(LoginRequiredMixin, View):
+    """Apply one action from the bulk toolbar to every checked product."""
+
+    form_class = ProductBulkActionForm
+    success_messages = {
+        "delete": "{count} ta mahsulot o‘chirildi",
+        "set_price": "{count} ta mahsulot narxi yangilandi",
+        "adjust_percent": "{count} ta mahsulot narxi yangilandi",
+        "adjust_amount": "{count} ta mahsulot narxi yangilandi",
+    }
+
+    def post(self, request, *args, **kwargs):
+        form = self.form_class(request.POST)
+        if not form.is_valid():
+            message = str(next(iter(form.errors.values()))[0])
+            return HttpResponse(
+                status=400,
+                headers={"HX-Trigger": json.dumps({"showToast": {"type": "error", "message": message}})},
+            )
+        count = form.save()
+        message = self.success_messages[form.cleaned_data["action"]].format(count=count)
+        headers = {
+            "HX-Trigger": json.dumps(
+                {
+                    "reloadProducts": True,
+                    "showToast": {
+                        "type": "success",
+                        "message": message,
+                    },
+                }
+            ),
+        }
+        return HttpResponse(status=204, headers=headers)
+
+
+class ProfilingStatsView(UserPassesTestMixin, View):
+    """Staff-only dump of the rolling per-view timings; POST clears them."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"views": profiling.snapshot(), "result_cache": results.counters.snapshot()})
+
+    def post(self, request, *args, **kwargs):
+        profiling.view_stats.reset()
+        results.counters.reset()
         return HttpResponse(status=204)
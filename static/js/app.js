@@ -99,14 +99,36 @@ function productForm(initialPreview = '') {
             if (this.priceInput) {
                 this.applyFormattedPrice();
             }
-            const xhr = event.detail?.xhr;
-            if (event.detail?.successful && xhr && xhr.status === 204) {
-                window.AppShell?.closeModal();
-            }
+            // A successful save closes the modal through the closeModal trigger.
+        },
+    };
+}
+
+function selectedProductIds() {
+    const boxes = document.querySelectorAll('input[name="ids"][form="bulk-form"]:checked');
+    return [...new Set([...boxes].map((box) => box.value))];
+}
+
+function bulkSelection() {
+    return {
+        count: 0,
+        action: 'set_price',
+        refresh() {
+            this.count = selectedProductIds().length;
         },
     };
 }
 
+document.addEventListener('change', (event) => {
+    const scope = event.target.dataset?.selectAll;
+    if (!scope) {
+        return;
+    }
+    document.querySelectorAll(`${scope} input[name="ids"]`).forEach((box) => {
+        box.checked = event.target.checked;
+    });
+});
+
 document.addEventListener('htmx:configRequest', (event) => {
     // Add CSRF token to all HTMX requests
     const csrfTokenInput = document.querySelector('input[name="csrfmiddlewaretoken"]');
@@ -160,6 +182,73 @@ document.addEventListener('stopInfiniteScroll', () => {
     }
 });
 
-document.addEventListener('htmx:responseError', () => {
+document.addEventListener('htmx:responseError', (event) => {
+    if ((event.detail.xhr.getResponseHeader('HX-Trigger') || '').includes('showToast')) {
+        return;
+    }
     window.AppShell?.addToast('Xatolik yuz berdi. Qayta urinib ko‘ring.', 'error');
 });
+
+const EMPTY_PRODUCT_ID = '00000000-0000-0000-0000-000000000000';
+
+function removeDuplicateProducts() {
+    // A create can arrive twice: as this client's own OOB swap and from the live feed.
+    const seen = new Set();
+    document.querySelectorAll('[id^="product-row-"], [id^="product-card-"]').forEach((element) => {
+        if (seen.has(element.id)) {
+            element.remove();
+        } else {
+            seen.add(element.id);
+        }
+    });
+}
+
+function applyProductEvent(event, rowUrl) {
+    const row = document.getElementById(`product-row-${event.id}`);
+    const card = document.getElementById(`product-card-${event.id}`);
+    const url = rowUrl.replace(EMPTY_PRODUCT_ID, event.id);
+    if (event.kind === 'deleted') {
+        row?.remove();
+        card?.remove();
+        return;
+    }
+    if (event.kind === 'updated') {
+        if (row) htmx.ajax('GET', url, { target: row, swap: 'outerHTML' });
+        if (card) htmx.ajax('GET', `${url}?view=cards`, { target: card, swap: 'outerHTML' });
+        return;
+    }
+    // Only the unfiltered, newest-first list is known to start with a new product.
+    const query = document.querySelector('input[name="q"]')?.value;
+    const sort = document.querySelector('select[name="sort"]')?.value;
+    const stock = document.querySelector('select[name="stock"]')?.value;
+    if (event.kind === 'created' && !row && !query && !stock && (!sort || sort === 'created')) {
+        htmx.ajax('GET', url, { target: '#products-tbody', swap: 'afterbegin' }).then(removeDuplicateProducts);
+        htmx.ajax('GET', `${url}?view=cards`, { target: '#products-cards-container', swap: 'afterbegin' })
+            .then(removeDuplicateProducts);
+    }
+}
+
+function connectProductEvents(element) {
+    const source = new EventSource(element.dataset.productEvents);
+    let version = null;
+    source.addEventListener('product', (message) => {
+        const event = JSON.parse(message.data);
+        // A skipped version means a change this page never saw: reload instead of patching.
+        const missed = version !== null && event.version > version + 1;
+        version = event.version;
+        if (event.kind === 'reload' || missed) {
+            htmx.trigger(document.body, 'reloadProducts');
+            return;
+        }
+        applyProductEvent(event, element.dataset.rowUrl);
+    });
+}
+
+document.addEventListener('htmx:afterSettle', removeDuplicateProducts);
+
+document.addEventListener('DOMContentLoaded', () => {
+    const feed = document.querySelector('[data-product-events]');
+    if (feed && window.EventSource) {
+        connectProductEvents(feed);
+    }
+});